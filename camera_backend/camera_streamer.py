@@ -6,22 +6,36 @@ Uses PixeLink API's getNextFrame for efficient frame grabbing.
 """
 import logging
 import asyncio
-import base64
-import io
+import struct
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, Set
 import numpy as np
-from PIL import Image
 
 # Import shared camera utilities to avoid code duplication
 from camera_utils import (
     PIXELINK_AVAILABLE, 
-    PxLApi,
     capture_frame,
-    generate_simulated_frame
+    determine_raw_image_size,
+    encode_jpeg,
+    frame_digest,
+    generate_simulated_frame,
+    resize_frame
 )
 
 logger = logging.getLogger(__name__)
 
+# Target interval between streamed frames (~30 FPS)
+FRAME_PERIOD = 1.0 / 30
+
+# Max seconds between broadcasts when frames are unchanged (client keep-alive)
+HEARTBEAT_INTERVAL = 1.0
+
+# Smallest allowed stream downscale factor
+MIN_STREAM_SCALE = 0.1
+
+# Max clients sent to concurrently before yielding to the event loop
+BROADCAST_BATCH_SIZE = 50
+
 
 class CameraStreamer:
     """
@@ -29,23 +43,73 @@ class CameraStreamer:
     Captures frames from PixeLink camera and encodes them as JPEG for streaming.
     """
     
-    def __init__(self, camera_handle=None, width=1280, height=1024):
+    def __init__(self, camera_handle=None, width=1280, height=1024, stream_scale=1.0):
         self.camera_handle = camera_handle
+        # PixelinkCamera owning the hardware stream state; see set_camera()
+        self.camera = None
         self.width = width
         self.height = height
+        # Downscale factor applied before JPEG encoding (1.0 = full resolution)
+        self.stream_scale = stream_scale
         self.is_streaming = False
         self.active_clients: Set = set()
         self.stream_task: Optional[asyncio.Task] = None
+        # Event loop running the stream, cached in start_streaming()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
         self.current_frame: Optional[bytes] = None
-        self.frame_lock = asyncio.Lock()
         self.capture_lock = asyncio.Lock()  # Prevent capture conflicts
-        self.paused = False  # Pause streaming during captures
+        # Pause streaming during captures: cleared while paused, and the loop
+        # sets _idle_event once it is parked with no capture in flight
+        self._run_event = asyncio.Event()
+        self._run_event.set()
+        self._idle_event = asyncio.Event()
+        self._reset_buffers()
         
-    def set_camera(self, camera_handle, width, height):
-        """Update camera handle and dimensions."""
-        self.camera_handle = camera_handle
-        self.width = width
-        self.height = height
+    def _reset_buffers(self):
+        """
+        (Re)allocate the reusable frame buffers for the current dimensions.
+        
+        Simulated frames ping-pong between two buffers: the pipelined capture
+        fills one while the encoder thread still reads the other. Ownership is
+        handed over by awaiting the encode before the capture after next starts,
+        so no lock is needed. Real frames get a fresh RGB array from
+        formatNumPyImage, so only their raw buffer (used by one capture at a
+        time) is reused.
+        """
+        self._sim_bufs = [np.empty((self.height, self.width, 3), dtype=np.uint8) for _ in range(2)]
+        self._sim_idx = 0
+        # Cached raw frame size and reused raw capture buffer (derived on first capture)
+        self._cap_dims = None
+        self._cap_buf: Optional[np.ndarray] = None
+        # Hash of the last broadcast raw frame (for skipping unchanged frames)
+        self._last_frame_hash: Optional[int] = None
+        
+    def set_camera(self, camera):
+        """
+        Attach the PixelinkCamera to stream from (handle and dimensions).
+        
+        The hardware stream is started and stopped through the camera's
+        acquire_stream()/release_stream(), so its is_streaming state stays
+        correct for still captures.
+        """
+        self.camera = camera
+        self.camera_handle = camera.camera_handle
+        self.width = camera.width
+        self.height = camera.height
+        self._reset_buffers()
+        
+    def set_stream_scale(self, scale: float) -> float:
+        """
+        Set the downscale factor applied to streamed frames.
+        Clamped to [MIN_STREAM_SCALE, 1.0]; takes effect on the next frame.
+        
+        Returns:
+            The scale actually applied
+        """
+        self.stream_scale = max(MIN_STREAM_SCALE, min(float(scale), 1.0))
+        self._last_frame_hash = None  # Re-encode even if the scene is static
+        logger.info("🔍 Stream scale set to %.2f", self.stream_scale)
+        return self.stream_scale
         
     async def start_streaming(self):
         """Start the streaming loop."""
@@ -59,6 +123,8 @@ class CameraStreamer:
             print(f"[STREAMER] No camera, using simulated stream")
             logger.warning("Camera not available, using simulated stream")
         
+        self._loop = asyncio.get_running_loop()
+        
         # Mark as streaming BEFORE starting the loop
         # This prevents multiple streams from being started
         self.is_streaming = True
@@ -88,8 +154,10 @@ class CameraStreamer:
         """Register a new WebSocket client - returns IMMEDIATELY."""
         print(f"[STREAMER] Adding client... (current count: {len(self.active_clients)})")
         self.active_clients.add(websocket)
+        # Force the next frame out even if the scene is static, so the new client gets a picture
+        self._last_frame_hash = None
         print(f"[STREAMER] Client registered. Total clients: {len(self.active_clients)}")
-        logger.info(f"🔌 Client registered. Total clients: {len(self.active_clients)}")
+        logger.info("🔌 Client registered. Total clients: %s", len(self.active_clients))
         
         # Start streaming if this is the first client
         # Fire and forget - completely non-blocking, no waits
@@ -109,7 +177,7 @@ class CameraStreamer:
     async def remove_client(self, websocket):
         """Unregister a WebSocket client."""
         self.active_clients.discard(websocket)
-        logger.info(f"🔌 Client disconnected. Total clients: {len(self.active_clients)}")
+        logger.info("🔌 Client disconnected. Total clients: %s", len(self.active_clients))
         
         # Stop streaming if no more clients
         if len(self.active_clients) == 0 and self.is_streaming:
@@ -123,53 +191,30 @@ class CameraStreamer:
         """
         print(f"[STREAM_LOOP] Starting stream loop")
         logger.info("🎬 Starting stream loop")
-        logger.info(f"   Initial state: is_streaming={self.is_streaming}, clients={len(self.active_clients)}")
+        logger.info("   Initial state: is_streaming=%s, clients=%s", self.is_streaming, len(self.active_clients))
         
-        # Start camera streaming in the background (non-blocking, fire and forget)
-        # We'll start capturing frames immediately and let the stream start happen async
-        if PIXELINK_AVAILABLE and self.camera_handle:
-            print(f"[STREAM_LOOP] Initiating camera hardware stream...")
-            async def start_stream_async():
-                """Start stream in background without blocking"""
-                try:
-                    print(f"[CAMERA] Calling PxLApi.setStreamState(START)...")
-                    def do_start_stream():
-                        try:
-                            ret = PxLApi.setStreamState(self.camera_handle, PxLApi.StreamState.START)
-                            if PxLApi.apiSuccess(ret[0]):
-                                print(f"[CAMERA] Stream started successfully")
-                                logger.info("✅ Camera stream started")
-                                return True
-                            elif ret[0] == -2147483644:  # ApiAlreadyStreamingError
-                                print(f"[CAMERA] Already streaming")
-                                logger.info("✅ Camera already streaming")
-                                return True
-                            else:
-                                print(f"[CAMERA] Stream start returned: {ret[0]}")
-                                logger.warning(f"Stream start returned: {ret[0]}")
-                                return False
-                        except Exception as e:
-                            print(f"[CAMERA] Exception in stream start: {e}")
-                            logger.error(f"Exception in stream start: {e}")
-                            return False
-                    
-                    await asyncio.to_thread(do_start_stream)
-                    print(f"[CAMERA] Stream start complete")
-                except Exception as e:
-                    print(f"[CAMERA] Error in async stream start: {e}")
-                    logger.error(f"Error in async stream start: {e}")
-            
-            # Start stream in background, don't wait for it
-            asyncio.create_task(start_stream_async())
-            logger.info("📹 Camera stream start initiated in background")
-            print(f"[STREAM_LOOP] Camera start task created, continuing...")
-            # Give it just a tiny moment to potentially start
-            await asyncio.sleep(0.05)
+        # Hold a reference on the camera's hardware stream while the loop runs.
+        # Only this background task waits for the START; the event loop does not.
+        stream_acquired = False
+        if PIXELINK_AVAILABLE and self.camera_handle and self.camera is not None:
+            stream_acquired = await asyncio.to_thread(self.camera.acquire_stream, "live stream")
+            if not stream_acquired:
+                logger.warning("Camera stream could not be started; frame grabs will retry")
         
         print(f"[STREAM_LOOP] Entering main capture loop")
         
+        # Keep encoding on one persistent thread instead of the shared to_thread pool
+        loop = self._loop
+        encoder = ThreadPoolExecutor(max_workers=1, thread_name_prefix="jpeg-encoder")
+        
         frame_count = 0
         last_status_log = 0
+        # In-flight capture of the next frame, overlapped with encode/broadcast
+        next_capture: Optional[asyncio.Task] = None
+        next_tick = loop.time() + FRAME_PERIOD
+        last_broadcast = 0.0
+        self._last_frame_hash = None
+        self._idle_event.clear()
         try:
             while self.is_streaming:
                 # Check if we still have clients - stop immediately if not
@@ -179,15 +224,24 @@ class CameraStreamer:
                     break
                 
                 # Check if paused (during capture)
-                if self.paused:
-                    await asyncio.sleep(0.05)  # Wait while paused
+                if not self._run_event.is_set():
+                    # Let the in-flight grab finish before the camera is used elsewhere
+                    # (cancelling the task would not stop the SDK call in its thread)
+                    if next_capture is not None:
+                        await next_capture
+                        next_capture = None
+                    self._idle_event.set()
+                    await self._run_event.wait()  # Block until resumed
+                    self._idle_event.clear()
                     continue
                 
-                # Capture frame
-                if PIXELINK_AVAILABLE and self.camera_handle:
-                    frame_data = await asyncio.to_thread(self._capture_real_frame)
-                else:
-                    frame_data = await asyncio.to_thread(self._capture_simulated_frame)
+                # Capture frame (normally already started during the previous iteration)
+                if next_capture is None:
+                    next_capture = asyncio.create_task(asyncio.to_thread(self._capture_frame))
+                frame_data = await next_capture
+                
+                # Start grabbing the next frame while this one is encoded and broadcast
+                next_capture = asyncio.create_task(asyncio.to_thread(self._capture_frame))
                 
                 if frame_data is None:
                     # Don't log every failure - only after multiple failures
@@ -196,59 +250,108 @@ class CameraStreamer:
                     await asyncio.sleep(0.1)
                     continue
                 
-                # Encode frame as JPEG
-                jpeg_data = await asyncio.to_thread(self._encode_jpeg, frame_data)
+                # Static scene: skip encode/broadcast of an identical frame,
+                # but still resend at least every HEARTBEAT_INTERVAL
+                frame_hash = frame_digest(frame_data)
+                unchanged = (
+                    frame_hash is not None
+                    and frame_hash == self._last_frame_hash
+                    and loop.time() - last_broadcast < HEARTBEAT_INTERVAL
+                )
                 
-                # Store current frame
-                async with self.frame_lock:
+                if not unchanged:
+                    # Encode frame as JPEG
+                    jpeg_data = await loop.run_in_executor(encoder, self._encode_jpeg, frame_data)
+                    
+                    # Store current frame (single writer; plain attribute assignment is atomic)
                     self.current_frame = jpeg_data
-                
-                # Broadcast to all connected clients
-                if self.active_clients:
-                    await self._broadcast_frame(jpeg_data)
-                else:
-                    logger.warning("⚠️ No clients to broadcast to, stopping")
-                    break
-                
-                frame_count += 1
+                    
+                    # Broadcast to all connected clients
+                    if self.active_clients:
+                        await self._broadcast_frame(jpeg_data)
+                    else:
+                        logger.warning("⚠️ No clients to broadcast to, stopping")
+                        break
+                    
+                    self._last_frame_hash = frame_hash
+                    last_broadcast = loop.time()
+                    frame_count += 1
                 
                 # Log status every 300 frames (~10 seconds at 30fps)
                 if frame_count - last_status_log >= 300:
-                    logger.info(f"📊 Streaming status: {frame_count} frames sent, {len(self.active_clients)} active client(s)")
+                    logger.info("📊 Streaming status: %s frames sent, %s active client(s)", frame_count, len(self.active_clients))
                     last_status_log = frame_count
                 
-                # Small delay to control frame rate (~30 FPS)
-                await asyncio.sleep(0.033)
+                # Sleep only until the next frame deadline (~30 FPS)
+                now = loop.time()
+                delay = next_tick - now
+                next_tick += FRAME_PERIOD
+                if delay < -FRAME_PERIOD:
+                    # Fell behind by more than a frame - resync instead of catching up
+                    next_tick = now + FRAME_PERIOD
+                if delay > 0:
+                    await asyncio.sleep(delay)
                 
         except asyncio.CancelledError:
             logger.info("Stream loop cancelled")
         except Exception as e:
-            logger.error(f"Stream loop error: {e}", exc_info=True)
+            logger.error("Stream loop error: %s", e, exc_info=True)
         finally:
             # Mark as not streaming
             self.is_streaming = False
-            # Stop camera streaming
-            if PIXELINK_AVAILABLE and self.camera_handle:
-                PxLApi.setStreamState(self.camera_handle, PxLApi.StreamState.STOP)
-            logger.info(f"🏁 Stream loop ended. Total frames: {frame_count}, Active clients: {len(self.active_clients)}")
+            self._idle_event.clear()
+            if next_capture is not None:
+                next_capture.cancel()
+            encoder.shutdown(wait=False)
+            # Drop our stream reference; the camera stops the stream if we were the last user
+            if stream_acquired:
+                self.camera.release_stream()
+            logger.info("🏁 Stream loop ended. Total frames: %s, Active clients: %s", frame_count, len(self.active_clients))
+    
+    def _capture_frame(self) -> Optional[np.ndarray]:
+        """Capture a frame from the camera, or a simulated one without hardware."""
+        if PIXELINK_AVAILABLE and self.camera_handle:
+            return self._capture_real_frame()
+        return self._capture_simulated_frame()
     
     def _capture_real_frame(self) -> Optional[np.ndarray]:
         """
         Capture a single frame from the PixeLink camera.
         Uses shared utility function to avoid code duplication.
+        
+        Frame size and raw buffer are cached until set_camera() is called again,
+        so steady-state capture skips the ROI/pixel-format queries and allocation.
         """
-        return capture_frame(self.camera_handle, max_retries=3)
+        if self._cap_dims is None:
+            width, height, bytes_per_pixel = determine_raw_image_size(self.camera_handle)
+            if width == 0 or height == 0:
+                return None
+            self._cap_dims = (width, height, bytes_per_pixel)
+            self._cap_buf = np.empty((height, width * bytes_per_pixel), dtype=np.uint8)
+        
+        frame = capture_frame(
+            self.camera_handle,
+            max_retries=3,
+            image_size=self._cap_dims,
+            raw_buffer=self._cap_buf
+        )
+        if frame is not None and self.camera is not None:
+            # Same software gamma as stills, so the preview matches saved images
+            frame = self.camera.apply_software_gamma(frame)
+        return frame
     
     def _capture_simulated_frame(self) -> np.ndarray:
         """
-        Generate a simulated test pattern frame.
+        Generate a simulated test pattern frame into the next reused buffer.
         Uses shared utility function to avoid code duplication.
         """
-        return generate_simulated_frame(self.width, self.height)
+        self._sim_idx ^= 1
+        return generate_simulated_frame(self.width, self.height, out=self._sim_bufs[self._sim_idx])
     
     def _encode_jpeg(self, frame_data: np.ndarray, quality: int = 85) -> bytes:
         """
-        Encode numpy array as JPEG bytes.
+        Encode numpy array as JPEG bytes, downscaled by stream_scale.
+        Uses shared utility function (libjpeg-turbo when available).
         
         Args:
             frame_data: RGB numpy array
@@ -257,42 +360,46 @@ class CameraStreamer:
         Returns:
             JPEG encoded bytes
         """
-        image = Image.fromarray(frame_data, mode='RGB')
-        buffer = io.BytesIO()
-        image.save(buffer, format='JPEG', quality=quality)
-        return buffer.getvalue()
+        if self.stream_scale < 1.0:
+            frame_data = resize_frame(frame_data, self.stream_scale)
+        return encode_jpeg(frame_data, quality=quality)
     
     async def _broadcast_frame(self, jpeg_data: bytes):
         """
         Send frame to all connected WebSocket clients.
-        Encodes as base64 for JSON transmission.
+        Sent as a binary message: 8-byte little-endian float64 timestamp
+        followed by the raw JPEG bytes (no base64/JSON).
         """
         if not self.active_clients:
             logger.warning("⚠️ Broadcasting but no active clients!")
             return
-            
-        # Encode as base64 for WebSocket JSON transmission
-        base64_data = base64.b64encode(jpeg_data).decode('utf-8')
         
-        message = {
-            "type": "frame",
-            "data": base64_data,
-            "timestamp": asyncio.get_event_loop().time()
-        }
+        payload = struct.pack('<d', self._loop.time()) + jpeg_data
+        # One ASGI message shared by every client (send_bytes would build a new one per client)
+        message = {"type": "websocket.send", "bytes": payload}
         
-        # Send to all clients, remove disconnected ones
+        # Send to all clients concurrently so one slow client doesn't stall the rest,
+        # yielding to the event loop between batches for large fan-outs
+        clients = list(self.active_clients)  # Snapshot to avoid modification during iteration
         disconnected = set()
-        for client in list(self.active_clients):  # Convert to list to avoid modification during iteration
-            try:
-                await client.send_json(message)
-            except Exception as e:
-                logger.warning(f"⚠️ Failed to send to client, marking for removal: {e}")
-                disconnected.add(client)
+        for start in range(0, len(clients), BROADCAST_BATCH_SIZE):
+            batch = clients[start:start + BROADCAST_BATCH_SIZE]
+            if start:
+                await asyncio.sleep(0)
+            results = await asyncio.gather(
+                *(client.send(message) for client in batch),
+                return_exceptions=True
+            )
+            # Remove disconnected ones
+            for client, result in zip(batch, results):
+                if isinstance(result, Exception):
+                    logger.warning("⚠️ Failed to send to client, marking for removal: %s", result)
+                    disconnected.add(client)
         
         # Clean up disconnected clients
         for client in disconnected:
             self.active_clients.discard(client)
-            logger.info(f"🧹 Cleaned up stale client. Remaining: {len(self.active_clients)}")
+            logger.info("🧹 Cleaned up stale client. Remaining: %s", len(self.active_clients))
             
         # Stop streaming if no clients left after cleanup
         if len(self.active_clients) == 0 and self.is_streaming:
@@ -301,20 +408,22 @@ class CameraStreamer:
     
     async def get_current_frame(self) -> Optional[bytes]:
         """Get the most recent frame (JPEG bytes)."""
-        async with self.frame_lock:
-            return self.current_frame
+        return self.current_frame
     
     async def pause_streaming(self):
         """Pause streaming temporarily (for captures)."""
         logger.info("⏸️ Pausing stream for capture")
-        self.paused = True
-        # Wait a moment for current frame capture to complete
-        await asyncio.sleep(0.1)
+        self._run_event.clear()
+        # Wait until the loop reaches a frame boundary (or exits)
+        if self.stream_task and not self.stream_task.done():
+            idle_wait = asyncio.create_task(self._idle_event.wait())
+            await asyncio.wait({idle_wait, self.stream_task}, return_when=asyncio.FIRST_COMPLETED)
+            idle_wait.cancel()
     
     async def resume_streaming(self):
         """Resume streaming after capture."""
         logger.info("▶️ Resuming stream after capture")
-        self.paused = False
+        self._run_event.set()
 
 
 # Global streamer instance
@@ -4,41 +4,123 @@ Camera Utility Functions
 Shared utilities for PixeLink camera operations.
 Used by both pixelink_camera.py and camera_streamer.py to avoid code duplication.
 """
+import io
 import logging
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from functools import lru_cache
 import numpy as np
 from typing import Optional, Tuple
+from PIL import Image, features as pil_features
 
-# Fix for wmic error in pixelinkWrapper on newer Windows versions
+# Prefer libjpeg-turbo via simplejpeg for JPEG encoding, fall back to PIL
 try:
-    from pixelinkWrapper import PxLApi
-    PIXELINK_AVAILABLE = True
-except Exception as e:
-    logging.warning(f"Error importing pixelinkWrapper: {e}")
-    logging.warning("Trying alternative import method...")
+    import simplejpeg
+    SIMPLEJPEG_AVAILABLE = True
+except ImportError:
+    simplejpeg = None
+    SIMPLEJPEG_AVAILABLE = False
+
+# nvJPEG (pynvjpeg) is optional - GPU JPEG encoding when a CUDA device is present
+try:
+    from nvjpeg import NvJpeg
+    _nvjpeg = NvJpeg()  # Raises without a usable CUDA device
+    _nvjpeg_lock = threading.Lock()
+    NVJPEG_AVAILABLE = True
+except Exception:
+    _nvjpeg = None
+    NVJPEG_AVAILABLE = False
+
+# xxhash is optional - fast hashing to detect unchanged frames
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    xxhash = None
+    XXHASH_AVAILABLE = False
+
+# OpenCV is optional - SIMD resize for downscaled streaming
+try:
+    import cv2
+    OPENCV_AVAILABLE = True
+except ImportError:
+    cv2 = None
+    OPENCV_AVAILABLE = False
+
+# Numba is optional - JIT-compiles the simulated frame generator
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+def _import_pxlapi():
+    """
+    Import PxLApi from pixelinkWrapper.
+    
+    The wrapper shells out to wmic at import time to read the Windows version,
+    and wmic is gone from newer Windows releases. Only there is
+    subprocess.check_output patched (and always restored) for the import, so
+    other platforms import the wrapper once with no global side effects.
+    """
+    if sys.platform != "win32" or shutil.which("wmic") is not None:
+        from pixelinkWrapper import PxLApi
+        return PxLApi
+    
+    original_check_output = subprocess.check_output
+    
+    def patched_check_output(*args, **kwargs):
+        try:
+            return original_check_output(*args, **kwargs)
+        except FileNotFoundError:
+            # Return a dummy version string if wmic fails
+            return b"10.0.0"
+    
+    subprocess.check_output = patched_check_output
     try:
-        # Try to import with subprocess workaround
-        import subprocess
-        original_check_output = subprocess.check_output
-        
-        def patched_check_output(*args, **kwargs):
-            try:
-                return original_check_output(*args, **kwargs)
-            except FileNotFoundError:
-                # Return a dummy version string if wmic fails
-                return b"10.0.0"
-        
-        subprocess.check_output = patched_check_output
         from pixelinkWrapper import PxLApi
+    finally:
         subprocess.check_output = original_check_output
-        PIXELINK_AVAILABLE = True
-        logging.info("Successfully imported pixelinkWrapper with workaround")
-    except Exception as e2:
-        PIXELINK_AVAILABLE = False
-        logging.warning(f"Alternative import also failed: {e2}. Running in mock mode.")
-        PxLApi = None
+    logging.info("Imported pixelinkWrapper with wmic workaround")
+    return PxLApi
+
+
+try:
+    PxLApi = _import_pxlapi()
+    PIXELINK_AVAILABLE = True
+except Exception as e:
+    PIXELINK_AVAILABLE = False
+    logging.warning("Error importing pixelinkWrapper: %s. Running in mock mode.", e)
+    PxLApi = None
 
 logger = logging.getLogger(__name__)
 
+# Return-code check and feature ids used per frame/size query, resolved once
+if PIXELINK_AVAILABLE:
+    api_success = PxLApi.apiSuccess
+    _FID_ROI = PxLApi.FeatureId.ROI
+    _FID_PIXEL_ADDRESSING = PxLApi.FeatureId.PIXEL_ADDRESSING
+    _FID_PIXEL_FORMAT = PxLApi.FeatureId.PIXEL_FORMAT
+else:
+    api_success = None
+    _FID_ROI = _FID_PIXEL_ADDRESSING = _FID_PIXEL_FORMAT = None
+
+# Bytes per pixel for common unpacked formats, resolved once instead of asking
+# the wrapper per call. Anything not listed falls back to PxLApi.getBytesPerPixel.
+_BYTES_PER_PIXEL = {}
+if PIXELINK_AVAILABLE:
+    for _name, _bpp in (
+        ('MONO8', 1), ('MONO16', 2), ('YUV422', 2),
+        ('BAYER8_GRBG', 1), ('BAYER8_RGGB', 1), ('BAYER8_GBRG', 1), ('BAYER8_BGGR', 1),
+        ('BAYER16_GRBG', 2), ('BAYER16_RGGB', 2), ('BAYER16_GBRG', 2), ('BAYER16_BGGR', 2),
+        ('RGB24', 3), ('RGB48', 6), ('BGR24', 3),
+    ):
+        if hasattr(PxLApi.PixelFormat, _name):
+            _BYTES_PER_PIXEL[int(getattr(PxLApi.PixelFormat, _name))] = _bpp
+
 
 def determine_raw_image_size(camera_handle) -> Tuple[int, int, int]:
     """
@@ -52,8 +134,8 @@ def determine_raw_image_size(camera_handle) -> Tuple[int, int, int]:
     """
     try:
         # Get ROI (Region of Interest)
-        ret = PxLApi.getFeature(camera_handle, PxLApi.FeatureId.ROI)
-        if not PxLApi.apiSuccess(ret[0]):
+        ret = PxLApi.getFeature(camera_handle, _FID_ROI)
+        if not api_success(ret[0]):
             return (0, 0, 0)
         
         params = ret[2]
@@ -64,8 +146,8 @@ def determine_raw_image_size(camera_handle) -> Tuple[int, int, int]:
         pixel_addressing_x = 1
         pixel_addressing_y = 1
         
-        ret = PxLApi.getFeature(camera_handle, PxLApi.FeatureId.PIXEL_ADDRESSING)
-        if PxLApi.apiSuccess(ret[0]):
+        ret = PxLApi.getFeature(camera_handle, _FID_PIXEL_ADDRESSING)
+        if api_success(ret[0]):
             params = ret[2]
             if params[PxLApi.PixelAddressingParams.MODE] != PxLApi.PixelAddressingModes.DECIMATE:
                 pixel_addressing_x = max(1, int(params[PxLApi.PixelAddressingParams.X_VALUE]))
@@ -76,46 +158,60 @@ def determine_raw_image_size(camera_handle) -> Tuple[int, int, int]:
         height = int(roi_height / pixel_addressing_y)
         
         # Get pixel format to determine bytes per pixel
-        ret = PxLApi.getFeature(camera_handle, PxLApi.FeatureId.PIXEL_FORMAT)
-        if not PxLApi.apiSuccess(ret[0]):
+        ret = PxLApi.getFeature(camera_handle, _FID_PIXEL_FORMAT)
+        if not api_success(ret[0]):
             return (0, 0, 0)
         
         pixel_format = int(ret[2][0])
-        bytes_per_pixel = PxLApi.getBytesPerPixel(pixel_format)
+        bytes_per_pixel = _BYTES_PER_PIXEL.get(pixel_format)
+        if bytes_per_pixel is None:
+            bytes_per_pixel = PxLApi.getBytesPerPixel(pixel_format)
         
         return (width, height, bytes_per_pixel)
         
     except Exception as e:
-        logger.error(f"Error determining image size: {e}")
+        logger.error("Error determining image size: %s", e)
         return (0, 0, 0)
 
 
-def capture_frame(camera_handle, max_retries: int = 3) -> Optional[np.ndarray]:
+def capture_frame(camera_handle, max_retries: int = 3,
+                  image_size: Optional[Tuple[int, int, int]] = None,
+                  raw_buffer: Optional[np.ndarray] = None) -> Optional[np.ndarray]:
     """
     Capture a single frame from the PixeLink camera.
     
     Args:
         camera_handle: PixeLink camera handle
         max_retries: Number of retry attempts for frame capture
+        image_size: Cached (width, height, bytes_per_pixel); queried from
+                    the camera when omitted
+        raw_buffer: Reusable uint8 buffer of shape (height, width * bytes_per_pixel)
+                    for the raw frame; allocated per call when omitted
         
     Returns:
-        RGB numpy array (height, width, 3) or None if failed
+        Read-only RGB numpy array (height, width, 3) or None if failed
     """
     try:
         # Determine image dimensions
-        width, height, bytes_per_pixel = determine_raw_image_size(camera_handle)
+        if image_size is None:
+            image_size = determine_raw_image_size(camera_handle)
+        width, height, bytes_per_pixel = image_size
         if width == 0 or height == 0:
             logger.error("Failed to determine image size")
             return None
         
         # Create NumPy buffer for raw image
-        np_image = np.zeros([height, width * bytes_per_pixel], dtype=np.uint8)
+        if raw_buffer is not None:
+            np_image = raw_buffer
+        else:
+            # Uninitialized: getNextNumPyFrame overwrites the whole buffer
+            np_image = np.empty((height, width * bytes_per_pixel), dtype=np.uint8)
         
         # Get frame with retries
         ret = None
         for attempt in range(max_retries):
             ret = PxLApi.getNextNumPyFrame(camera_handle, np_image)
-            if PxLApi.apiSuccess(ret[0]):
+            if api_success(ret[0]):
                 break
                 
             # Check for fatal errors
@@ -124,59 +220,247 @@ def capture_frame(camera_handle, max_retries: int = 3) -> Optional[np.ndarray]:
                 logger.debug("Stream stopped (expected when closing)")
                 return None
             elif ret[0] == PxLApi.ReturnCode.ApiNoCameraAvailableError:
-                logger.error(f"Camera not available: {ret[0]}")
+                logger.error("Camera not available: %s", ret[0])
                 return None
                 
             if attempt < max_retries - 1:
-                logger.debug(f"Frame grab attempt {attempt + 1} failed, retrying...")
+                logger.debug("Frame grab attempt %s failed, retrying...", attempt + 1)
         
-        if not ret or not PxLApi.apiSuccess(ret[0]):
+        if not ret or not api_success(ret[0]):
             return None
         
         frame_descriptor = ret[1]
         
         # Format as RGB24
         format_ret = PxLApi.formatNumPyImage(np_image, frame_descriptor, PxLApi.ImageFormat.RAW_RGB24)
-        if not PxLApi.apiSuccess(format_ret[0]):
+        if not api_success(format_ret[0]):
             return None
         
-        # Convert to RGB array
+        # Wrap the formatted RGB buffer without copying. The array is a
+        # read-only view that keeps the SDK's buffer alive; callers must copy
+        # it before writing into it.
         rgb_data = format_ret[1]
-        image_array = np.frombuffer(rgb_data, dtype=np.uint8)
-        image_array = image_array.reshape((height, width, 3))
-        
-        return image_array
+        return np.frombuffer(rgb_data, dtype=np.uint8, count=height * width * 3).reshape((height, width, 3))
         
     except Exception as e:
-        logger.error(f"Frame capture error: {e}")
+        logger.error("Frame capture error: %s", e)
+        return None
+
+
+def encode_jpeg(frame_data: np.ndarray, quality: int = 85, fast_dct: bool = True) -> bytes:
+    """
+    Encode an RGB frame as JPEG bytes.
+    
+    Uses nvJPEG on the GPU when available, then simplejpeg (libjpeg-turbo),
+    then OpenCV (libjpeg-turbo, GIL released), otherwise PIL.
+    
+    Args:
+        frame_data: RGB numpy array (height, width, 3), dtype uint8
+        quality: JPEG quality (1-100)
+        fast_dct: Use simplejpeg's faster, less accurate DCT. Fine for the
+                  live preview; pass False for saved stills.
+        
+    Returns:
+        JPEG encoded bytes
+    """
+    if NVJPEG_AVAILABLE:
+        try:
+            # nvjpeg follows OpenCV's BGR channel order
+            bgr = np.ascontiguousarray(frame_data[..., ::-1])
+            with _nvjpeg_lock:
+                return _nvjpeg.encode(bgr, quality)
+        except Exception as e:
+            logger.warning("nvJPEG encode failed, falling back to CPU: %s", e)
+    
+    if SIMPLEJPEG_AVAILABLE:
+        if not frame_data.flags['C_CONTIGUOUS']:
+            frame_data = np.ascontiguousarray(frame_data)
+        return simplejpeg.encode_jpeg(frame_data, quality=quality, colorspace='RGB', fastdct=fast_dct)
+    
+    if OPENCV_AVAILABLE:
+        ok, encoded = cv2.imencode('.jpg', cv2.cvtColor(frame_data, cv2.COLOR_RGB2BGR),
+                                   [cv2.IMWRITE_JPEG_QUALITY, quality])
+        if ok:
+            return encoded.tobytes()
+    
+    image = Image.fromarray(frame_data, mode='RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, format='JPEG', quality=quality)
+    # getvalue() hands back the BytesIO's internal bytes without copying as
+    # long as no getbuffer() view is alive, so don't "optimize" this into
+    # getbuffer().tobytes(), which always copies.
+    return buffer.getvalue()
+
+
+def frame_digest(frame_data: np.ndarray) -> Optional[int]:
+    """
+    Fast non-cryptographic hash of a frame's pixels (xxh3).
+    
+    Returns:
+        64-bit hash, or None when xxhash is not installed (change detection off)
+    """
+    if not XXHASH_AVAILABLE:
         return None
+    if not frame_data.flags['C_CONTIGUOUS']:
+        frame_data = np.ascontiguousarray(frame_data)
+    return xxhash.xxh3_64_intdigest(frame_data)
 
 
-def generate_simulated_frame(width: int = 1280, height: int = 1024) -> np.ndarray:
+def resize_frame(frame_data: np.ndarray, scale: float) -> np.ndarray:
+    """
+    Downscale an RGB frame before encoding.
+    
+    Uses OpenCV's area interpolation when available, otherwise falls back
+    to nearest-neighbour sampling of source rows and columns.
+    
+    Args:
+        frame_data: RGB numpy array (height, width, 3)
+        scale: Scale factor in (0, 1]
+        
+    Returns:
+        Downscaled RGB numpy array
+    """
+    height, width = frame_data.shape[:2]
+    new_width, new_height = max(1, int(width * scale)), max(1, int(height * scale))
+    if OPENCV_AVAILABLE:
+        return cv2.resize(frame_data, (new_width, new_height), interpolation=cv2.INTER_AREA)
+    
+    rows = np.arange(new_height) * height // new_height
+    cols = np.arange(new_width) * width // new_width
+    return frame_data[rows[:, None], cols]
+
+
+@lru_cache(maxsize=8)
+def gamma_lut(gamma: float) -> np.ndarray:
+    """
+    256-entry lookup table for software gamma: v -> 255 * (v / 255) ** (1 / gamma).
+    
+    Cached per gamma value and returned read-only, since callers share it.
+    """
+    lut = np.rint(np.linspace(0.0, 1.0, 256) ** (1.0 / gamma) * 255.0).astype(np.uint8)
+    lut.flags.writeable = False
+    return lut
+
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, nogil=True, cache=True)
+    def _apply_lut_kernel(src, lut, dst):
+        """dst[i] = lut[src[i]] over flat uint8 buffers (releases the GIL)."""
+        for i in prange(src.size):
+            dst[i] = lut[src[i]]
+
+    # Warm up with the types seen at runtime: read-only frames from
+    # capture_frame() and read-only tables from gamma_lut()
+    _warm_src = np.zeros(1, dtype=np.uint8)
+    _warm_src.flags.writeable = False
+    _apply_lut_kernel(_warm_src, gamma_lut(1.0), np.empty(1, dtype=np.uint8))
+    del _warm_src
+
+
+def apply_lut(frame_data: np.ndarray, lut: np.ndarray,
+              out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Map every byte of a uint8 frame through a 256-entry lookup table.
+    
+    Uses a parallel Numba kernel when available, otherwise np.take.
+    
+    Args:
+        frame_data: uint8 numpy array (may be read-only)
+        lut: uint8 array of 256 entries, e.g. from gamma_lut()
+        out: Optional preallocated buffer of the same shape to write into
+        
+    Returns:
+        Mapped uint8 array
+    """
+    if out is None:
+        out = np.empty_like(frame_data)
+    if NUMBA_AVAILABLE and frame_data.flags['C_CONTIGUOUS'] and out.flags['C_CONTIGUOUS']:
+        _apply_lut_kernel(frame_data.reshape(-1), lut, out.reshape(-1))
+    else:
+        np.take(lut, frame_data, out=out)
+    return out
+
+
+def jpeg_backend_info() -> str:
+    """
+    Describe the JPEG encoder in use, for startup logging.
+    
+    When falling back to PIL, reports whether Pillow is linked against
+    libjpeg-turbo so regressions to stock libjpeg are visible.
+    """
+    if NVJPEG_AVAILABLE:
+        return "nvJPEG (CUDA)"
+    
+    if SIMPLEJPEG_AVAILABLE:
+        return f"simplejpeg {getattr(simplejpeg, '__version__', 'unknown')} (libjpeg-turbo)"
+    
+    if OPENCV_AVAILABLE:
+        return f"OpenCV {cv2.__version__} imencode"
+    
+    try:
+        jpeg_version = pil_features.version('jpg') or 'unknown'
+        turbo = pil_features.check_feature('libjpeg_turbo')
+    except Exception:
+        jpeg_version, turbo = 'unknown', False
+    backend = "libjpeg-turbo" if turbo else "stock libjpeg - consider Pillow-SIMD/libjpeg-turbo"
+    return f"PIL (jpeglib {jpeg_version}, {backend})"
+
+
+@lru_cache(maxsize=4)
+def _gradient_ramps(width: int, height: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Row (height, 1), column (1, width) and diagonal (height, width) index
+    ramps for the test pattern. The diagonal is uint16 (row + col + 255
+    stays below 2**16 for any sensor size) to halve its per-frame temporary.
+    """
+    rows = np.arange(height, dtype=np.int32)[:, None]
+    cols = np.arange(width, dtype=np.int32)[None, :]
+    diag = (rows + cols).astype(np.uint16)
+    return rows, cols, diag
+
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, nogil=True, cache=True)
+    def _fill_simulated_frame(out, phase):
+        """Write the test pattern into `out` in one pass (releases the GIL)."""
+        height, width, _ = out.shape
+        for i in prange(height):
+            for j in range(width):
+                out[i, j, 0] = (i + phase) & 0xFF
+                out[i, j, 1] = (j + phase) & 0xFF
+                out[i, j, 2] = ((i + j + phase) >> 1) & 0xFF
+
+    # Compile (or load from the on-disk cache) at import, not on the first frame
+    _fill_simulated_frame(np.empty((1, 1, 3), dtype=np.uint8), 0)
+
+
+def generate_simulated_frame(width: int = 1280, height: int = 1024,
+                             out: Optional[np.ndarray] = None) -> np.ndarray:
     """
     Generate a simulated test pattern frame.
     
     Args:
         width: Frame width in pixels
         height: Frame height in pixels
+        out: Optional preallocated uint8 buffer of shape (height, width, 3)
+             to write into instead of allocating a new frame
         
     Returns:
         RGB numpy array (height, width, 3)
     """
-    import time
-    
-    # Create a gradient pattern for testing
-    image = np.zeros((height, width, 3), dtype=np.uint8)
+    image = out if out is not None else np.empty((height, width, 3), dtype=np.uint8)
     
     # Create animated gradient
     phase = int(time.time() * 50) % 256
     
-    for i in range(height):
-        for j in range(width):
-            image[i, j] = [
-                (i + phase) % 256,
-                (j + phase) % 256,
-                ((i + j + phase) // 2) % 256
-            ]
+    if NUMBA_AVAILABLE:
+        _fill_simulated_frame(image, phase)
+        return image
+    
+    # Broadcast row/column ramps instead of looping per pixel
+    rows, cols, diag = _gradient_ramps(width, height)
+    image[..., 0] = (rows + phase) & 0xFF
+    image[..., 1] = (cols + phase) & 0xFF
+    image[..., 2] = ((diag + np.uint16(phase)) >> 1) & 0xFF
     
     return image
@@ -2,14 +2,16 @@
 Configuration module for FastAPI Camera Service
 Loads settings from environment variables with sensible defaults
 """
+from functools import cached_property
+from typing import Tuple
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import List
 
 
 class Settings(BaseSettings):
     """Application settings loaded from environment variables"""
     
-    model_config = SettingsConfigDict(env_file='.env', env_file_encoding='utf-8')
+    model_config = SettingsConfigDict(env_file='.env', env_file_encoding='utf-8', case_sensitive=False)
     
     # Server Configuration
     host: str = "0.0.0.0"
@@ -26,6 +28,7 @@ class Settings(BaseSettings):
     image_save_path: str = "./captures"
     image_format: str = "jpg"
     image_quality: int = 95
+    stream_scale: float = 1.0  # Live stream downscale factor (0.1 - 1.0)
     
     # Video Recording Configuration
     video_save_path: str = "./videos"
@@ -37,10 +40,13 @@ class Settings(BaseSettings):
     # CORS Configuration
     allowed_origins: str = "http://localhost:3000,http://localhost:5173"
     
-    @property
-    def origins_list(self) -> List[str]:
-        """Parse CORS origins from comma-separated string"""
-        return [origin.strip() for origin in self.allowed_origins.split(",")]
+    @cached_property
+    def origins_list(self) -> Tuple[str, ...]:
+        """
+        CORS origins parsed from the comma-separated string, computed once.
+        Not a field, so it can't be set from the environment.
+        """
+        return tuple(origin.strip() for origin in self.allowed_origins.split(","))
 
 
 # Global settings instance
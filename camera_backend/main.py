@@ -3,20 +3,30 @@ FastAPI Camera Service - Minimal Essential API
 Provides HTTP endpoints for frontend and NestJS backend to control Pixelink camera
 Now supports direct frontend access with JWT authentication.
 """
+import asyncio
 import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from pathlib import Path
 from datetime import datetime
-from typing import Optional
+from typing import Annotated, List, Optional, Union
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Depends
+import orjson
+
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from fastapi.security import HTTPAuthorizationCredentials
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, Field
 
 from config import settings
 from pixelink_camera import PixelinkCamera
 from camera_streamer import streamer
+from camera_utils import jpeg_backend_info
 from auth import verify_jwt, get_optional_user
 
 # Configure logging
@@ -34,8 +44,13 @@ logging.getLogger('uvicorn.error').setLevel(logging.INFO)
 
 logger = logging.getLogger(__name__)
 
-# Global camera instance
-camera: Optional[PixelinkCamera] = None
+# Media directories (settings are static, so build the Paths once)
+CAPTURES_PATH = Path(settings.image_save_path)
+VIDEOS_PATH = Path(settings.video_save_path)
+
+# Blocking camera work (capture, JPEG encode, disk write) runs here so it never
+# stalls the event loop. One worker: the camera is a single shared resource.
+capture_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="camera-capture")
 
 # Video recording state
 video_recording_state = {
@@ -50,40 +65,38 @@ video_recording_state = {
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifecycle manager."""
-    global camera
-    
     # Startup
     logger.info("Starting Camera Service on port 8001...")
-    Path(settings.image_save_path).mkdir(parents=True, exist_ok=True)
+    CAPTURES_PATH.mkdir(parents=True, exist_ok=True)
     
     camera = PixelinkCamera(
         serial_number=settings.camera_serial_number if settings.camera_serial_number else None
     )
+    app.state.camera = camera
     
-    logger.info(f"Setting default exposure: {settings.default_exposure}ms")
+    logger.info("Setting default exposure: %sms", settings.default_exposure)
     camera.update_settings(
         exposure=settings.default_exposure,
         gain=settings.default_gain
     )
     
     current_settings = camera.get_settings()
-    logger.info(f"Camera initialized - Exposure: {current_settings['exposure']}ms, Gain: {current_settings['gain']}")
-    logger.info(f"   Exposure range: {current_settings['exposureMin']:.3f}ms - {current_settings['exposureMax']:.3f}ms")
-    logger.info(f"   Gain range: {current_settings['gainMin']:.2f} - {current_settings['gainMax']:.2f}")
+    logger.info("Camera initialized - Exposure: %sms, Gain: %s", current_settings['exposure'], current_settings['gain'])
+    logger.info("   Exposure range: %.3fms - %.3fms", current_settings['exposureMin'], current_settings['exposureMax'])
+    logger.info("   Gain range: %.2f - %.2f", current_settings['gainMin'], current_settings['gainMax'])
     
     # Initialize streamer with camera
-    streamer.set_camera(
-        camera.camera_handle,
-        camera.width,
-        camera.height
-    )
+    streamer.set_camera(camera)
+    streamer.set_stream_scale(settings.stream_scale)
     logger.info("Camera streamer initialized")
+    logger.info("JPEG encoder: %s", jpeg_backend_info())
     logger.info("Camera service ready")
     yield
     
     # Shutdown
-    if camera:
-        camera.disconnect()
+    capture_executor.shutdown(wait=True)
+    camera.drain()
+    camera.disconnect()
     logger.info("Camera service stopped")
 
 
@@ -91,19 +104,25 @@ app = FastAPI(
     title="Pixelink Camera Service",
     description="Camera control API for NestJS backend",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=settings.origins_list,
+    # Starlette checks `origin in allow_origins` per request: use a set, not a list
+    allow_origins=frozenset(settings.origins_list),
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
 
+# Upper bound on images per /capture/batch request
+MAX_BATCH_CAPTURES = 100
+
+
 # Request/Response models
 class CaptureRequest(BaseModel):
     """Image capture request."""
@@ -112,6 +131,16 @@ class CaptureRequest(BaseModel):
     gamma: Optional[float] = Field(None, ge=0, description="Gamma value")
 
 
+class CaptureBatchRequest(BaseModel):
+    """Burst capture request (one streaming pause for all images)."""
+    count: int = Field(1, ge=1, le=MAX_BATCH_CAPTURES, description="Number of images (ignored when exposures is given)")
+    exposures: Optional[List[Annotated[float, Field(gt=0)]]] = Field(None, min_length=1, max_length=MAX_BATCH_CAPTURES,
+                                                                    description="Per-image exposure in milliseconds (ms)")
+    exposure: Optional[float] = Field(None, ge=0, description="Exposure in milliseconds (ms) for every image")
+    gain: Optional[float] = Field(None, ge=0, description="Gain value")
+    gamma: Optional[float] = Field(None, ge=0, description="Gamma value")
+
+
 class SettingsUpdate(BaseModel):
     """Settings update request."""
     exposure: Optional[float] = Field(None, ge=0, description="Exposure in milliseconds (ms)")
@@ -120,15 +149,101 @@ class SettingsUpdate(BaseModel):
     autoExposure: Optional[bool] = Field(None, description="Enable/disable auto-exposure")
 
 
+class ImmutableStaticFiles(StaticFiles):
+    """
+    StaticFiles for captures/recordings: files get unique timestamped names
+    and are never rewritten, so browsers may cache them indefinitely.
+    (FileResponse already sets ETag/Last-Modified for conditional requests.)
+    """
+    
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+
+def get_camera(request: Request) -> PixelinkCamera:
+    """Dependency: the camera created in lifespan (503 until it exists)."""
+    camera = getattr(request.app.state, "camera", None)
+    if camera is None:
+        raise HTTPException(status_code=503, detail="Camera not initialized")
+    return camera
+
+
+def get_connected_camera(camera: PixelinkCamera = Depends(get_camera)) -> PixelinkCamera:
+    """Dependency: the camera, only if the hardware is connected."""
+    if not camera.is_connected:
+        raise HTTPException(status_code=503, detail="Camera not connected")
+    return camera
+
+
+# Last millisecond handed out by _file_timestamp (only called from the event loop)
+_last_file_ms = 0
+
+
+def _file_timestamp() -> str:
+    """
+    Local-time filename timestamp YYYYMMDD_HHMMSS_mmm from time.time_ns().
+    
+    Strictly increasing: a call in the same millisecond as the previous one
+    gets the next millisecond, so burst captures never overwrite each other
+    and filename order stays time order.
+    """
+    global _last_file_ms
+    ms = max(time.time_ns() // 1_000_000, _last_file_ms + 1)
+    _last_file_ms = ms
+    t = time.localtime(ms // 1000)
+    return (f"{t.tm_year:04d}{t.tm_mon:02d}{t.tm_mday:02d}_"
+            f"{t.tm_hour:02d}{t.tm_min:02d}{t.tm_sec:02d}_{ms % 1000:03d}")
+
+
+# Recent directory listings: (directory, suffix, reverse) -> (dir mtime_ns, monotonic time, files)
+_listing_cache: dict = {}
+LISTING_CACHE_TTL = 1.0  # seconds
+
+
+def _list_files(directory: Path, suffix: str, reverse: bool = False) -> list:
+    """
+    Name, size and mtime of the files in `directory` ending in `suffix` (blocking).
+    Uses os.scandir so the directory read supplies the entries without a glob pass.
+    
+    Repeated listings within LISTING_CACHE_TTL are served from memory as long
+    as the directory's mtime (which changes when files are added or removed)
+    is unchanged; the TTL bounds how stale a file's size can be.
+    """
+    key = (directory, suffix, reverse)
+    dir_mtime = os.stat(directory).st_mtime_ns
+    cached = _listing_cache.get(key)
+    now = time.monotonic()
+    if cached and cached[0] == dir_mtime and now - cached[1] < LISTING_CACHE_TTL:
+        return cached[2]
+    
+    with os.scandir(directory) as it:
+        entries = [e for e in it if e.name.endswith(suffix) and not e.name.startswith('.') and e.is_file()]
+    entries.sort(key=lambda e: e.name, reverse=reverse)
+    
+    files = []
+    for entry in entries:
+        stat = entry.stat()
+        files.append({
+            "filename": entry.name,
+            "size": stat.st_size,
+            "modified": datetime.fromtimestamp(stat.st_mtime).isoformat()
+        })
+    _listing_cache[key] = (dir_mtime, now, files)
+    return files
+
+
 # API Endpoints
 
 @app.get("/health")
-async def health_check():
+async def health_check(request: Request):
     """Health check endpoint."""
+    camera = getattr(request.app.state, "camera", None)
     return {
         "status": "healthy",
         "camera_connected": camera.is_connected if camera else False,
-        "timestamp": datetime.now().isoformat()
+        "timestamp": datetime.now()  # orjson emits ISO 8601 natively
     }
 
 
@@ -139,120 +254,164 @@ async def list_captures(user: dict = Depends(verify_jwt)):
     Protected endpoint - requires JWT token.
     """
     try:
-        captures_path = Path(settings.image_save_path)
-        if not captures_path.exists():
-            return {"files": [], "count": 0, "path": str(captures_path)}
-        
-        files = []
-        for file in sorted(captures_path.glob("*.jpg")):
-            stat = file.stat()
-            files.append({
-                "filename": file.name,
-                "size": stat.st_size,
-                "modified": datetime.fromtimestamp(stat.st_mtime).isoformat()
-            })
+        try:
+            files = await asyncio.to_thread(_list_files, CAPTURES_PATH, ".jpg")
+        except FileNotFoundError:
+            return {"files": [], "count": 0, "path": str(CAPTURES_PATH)}
         
         return {
             "files": files,
             "count": len(files),
-            "path": str(captures_path.absolute())
+            "path": str(CAPTURES_PATH.absolute())
         }
     except Exception as e:
-        logger.error(f"Error listing captures: {e}")
+        logger.error("Error listing captures: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def _capture_to_file(camera: PixelinkCamera, exposure: Optional[float],
+                           gain: Optional[float], gamma: Optional[float]) -> dict:
+    """
+    Capture one image into CAPTURES_PATH (the caller pauses the streamer).
+    Returns metadata matching NestJS Image entity structure.
+    """
+    # Generate filename with timestamp
+    timestamp = _file_timestamp()
+    filename = f"capture_{timestamp}.{settings.image_format}"
+    filepath = CAPTURES_PATH / filename
+    
+    # Capture image off the event loop - returns metadata matching NestJS Image entity
+    result = await asyncio.get_running_loop().run_in_executor(capture_executor, partial(
+        camera.capture_image,
+        save_path=filepath,
+        exposure=exposure,
+        gain=gain,
+        gamma=gamma
+    ))
+    return _capture_response(result, filepath)
+
+
+def _capture_response(result: dict, filepath: Path) -> dict:
+    """Log a finished capture and shape its metadata for NestJS."""
+    filename = filepath.name
+    
+    # Verify file was actually saved (capture_image already stat'ed it for fileSize)
+    actual_size = result.get('fileSize', 0)
+    if not actual_size:
+        logger.error("FILE NOT SAVED! Expected at: %s", filepath)
+    elif logger.isEnabledFor(logging.INFO):
+        logger.info("Image saved to disk: %s", filepath)
+        logger.info("   File size: %d bytes (%.2f KB)", actual_size, actual_size / 1024)
+        logger.info("   Dimensions: %sx%s", result.get('width', 'unknown'), result.get('height', 'unknown'))
+    
+    logger.info("Image captured: %s (size: %d bytes)", filename, actual_size)
+    
+    # Return response matching what NestJS camera.service.ts expects
+    return {
+        "success": result["success"],
+        "filename": result["filename"],
+        "filepath": result["filepath"],
+        "capturedAt": result["capturedAt"],
+        "exposureTime": result["exposureTime"],
+        "gain": result["gain"],
+        "fileSize": result["fileSize"],
+        "width": result["width"],
+        "height": result["height"],
+        "metadata": result["metadata"]
+    }
+
+
 @app.post("/capture")
-async def capture_image(request: CaptureRequest, user: dict = Depends(verify_jwt)):
+async def capture_image(request: CaptureRequest, user: dict = Depends(verify_jwt),
+                        camera: PixelinkCamera = Depends(get_camera)):
     """
     Capture image from camera.
     Protected endpoint - requires JWT token.
     Called by NestJS camera.service.ts (which adds DB metadata).
     Returns metadata matching NestJS Image entity structure.
     """
-    if not camera:
-        raise HTTPException(status_code=503, detail="Camera not initialized")
-    
     try:
         # Pause streaming to prevent conflicts
         streaming_was_active = streamer.is_streaming
         if streaming_was_active:
             await streamer.pause_streaming()
         
-        # Generate filename with timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
-        filename = f"capture_{timestamp}.{settings.image_format}"
-        filepath = Path(settings.image_save_path) / filename
-        
-        # Ensure directory exists
-        filepath.parent.mkdir(parents=True, exist_ok=True)
-        
-        # Capture image - returns metadata matching NestJS Image entity
-        result = camera.capture_image(
-            save_path=filepath,
-            exposure=request.exposure,
-            gain=request.gain,
-            gamma=request.gamma
-        )
+        result = await _capture_to_file(camera, request.exposure, request.gain, request.gamma)
         
         # Resume streaming if it was active
         if streaming_was_active:
             await streamer.resume_streaming()
         
-        # Verify file was actually saved
-        if filepath.exists():
-            actual_size = filepath.stat().st_size
-            logger.info(f"Image saved to disk: {filepath}")
-            logger.info(f"   File size: {actual_size} bytes ({actual_size / 1024:.2f} KB)")
-            logger.info(f"   Dimensions: {result.get('width', 'unknown')}x{result.get('height', 'unknown')}")
-        else:
-            logger.error(f"FILE NOT SAVED! Expected at: {filepath}")
-        
-        logger.info(f"Image captured: {filename} (size: {result.get('fileSize', 0)} bytes)")
-        
-        # Return response matching what NestJS camera.service.ts expects
-        return {
-            "success": result["success"],
-            "filename": result["filename"],
-            "filepath": result["filepath"],
-            "capturedAt": result["capturedAt"],
-            "exposureTime": result["exposureTime"],
-            "gain": result["gain"],
-            "fileSize": result["fileSize"],
-            "width": result["width"],
-            "height": result["height"],
-            "metadata": result["metadata"]
-        }
+        return result
         
     except Exception as e:
         # Make sure to resume streaming even if capture fails
         if streaming_was_active:
             await streamer.resume_streaming()
-        logger.error(f"Capture error: {e}", exc_info=True)
+        logger.error("Capture error: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=f"Capture failed: {str(e)}")
 
 
+@app.post("/capture/batch")
+async def capture_batch(request: CaptureBatchRequest, user: dict = Depends(verify_jwt),
+                        camera: PixelinkCamera = Depends(get_camera)):
+    """
+    Capture several images back-to-back.
+    Protected endpoint - requires JWT token.
+    
+    The live stream is paused once for the whole burst instead of once per
+    image, and shared gain/gamma/exposure are applied only before the first
+    image. With `exposures`, one image is taken per listed exposure.
+    Returns a list of per-image metadata in the same shape as /capture.
+    """
+    if request.exposures is not None:
+        exposures = request.exposures
+    else:
+        exposures = [request.exposure] + [None] * (request.count - 1)
+    filepaths = [CAPTURES_PATH / f"capture_{_file_timestamp()}.{settings.image_format}" for _ in exposures]
+    
+    streaming_was_active = streamer.is_streaming
+    try:
+        if streaming_was_active:
+            await streamer.pause_streaming()
+        
+        # Grabs run back-to-back; the camera encodes/writes each frame on its
+        # I/O pool while the next one is grabbed
+        results = await asyncio.get_running_loop().run_in_executor(capture_executor, partial(
+            camera.capture_burst,
+            filepaths,
+            exposures=exposures,
+            gain=request.gain,
+            gamma=request.gamma
+        ))
+        captures = [_capture_response(result, filepath) for result, filepath in zip(results, filepaths)]
+        
+        return {"success": True, "count": len(captures), "captures": captures}
+        
+    except Exception as e:
+        logger.error("Batch capture error: %s", e, exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Batch capture failed: {str(e)}")
+    finally:
+        if streaming_was_active:
+            await streamer.resume_streaming()
+
+
 @app.get("/settings")
-async def get_settings(user: dict = Depends(verify_jwt)):
+async def get_settings(user: dict = Depends(verify_jwt), camera: PixelinkCamera = Depends(get_camera)):
     """
     Get current camera settings.
     Protected endpoint - requires JWT token.
     """
-    if not camera:
-        raise HTTPException(status_code=503, detail="Camera not initialized")
-    
     return camera.get_settings()
 
 
 @app.put("/settings")
-async def update_settings(settings_update: SettingsUpdate, user: dict = Depends(verify_jwt)):
+async def update_settings(settings_update: SettingsUpdate, user: dict = Depends(verify_jwt),
+                          camera: PixelinkCamera = Depends(get_connected_camera)):
     """
     Update camera settings.
     Protected endpoint - requires JWT token.
     """
-    if not camera or not camera.is_connected:
-        raise HTTPException(status_code=503, detail="Camera not connected")
-    
     try:
         updated = camera.update_settings(
             exposure=settings_update.exposure,
@@ -260,22 +419,20 @@ async def update_settings(settings_update: SettingsUpdate, user: dict = Depends(
             gamma=settings_update.gamma,
             auto_exposure=settings_update.autoExposure
         )
-        logger.info(f"Settings updated: {settings_update}")
+        logger.info("Settings updated: %s", settings_update)
         return updated
     except Exception as e:
-        logger.error(f"Update error: {e}")
+        logger.error("Update error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/settings/auto-exposure/once")
-async def perform_auto_exposure_once(user: dict = Depends(verify_jwt)):
+async def perform_auto_exposure_once(user: dict = Depends(verify_jwt),
+                                     camera: PixelinkCamera = Depends(get_connected_camera)):
     """
     Perform a one-time auto-exposure adjustment.
     Protected endpoint - requires JWT token.
     """
-    if not camera or not camera.is_connected:
-        raise HTTPException(status_code=503, detail="Camera not connected")
-    
     try:
         success = camera.perform_one_time_auto_exposure()
         if success:
@@ -289,7 +446,7 @@ async def perform_auto_exposure_once(user: dict = Depends(verify_jwt)):
         else:
             raise HTTPException(status_code=500, detail="One-time auto-exposure failed or timed out")
     except Exception as e:
-        logger.error(f"Auto-exposure error: {e}")
+        logger.error("Auto-exposure error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -300,7 +457,8 @@ async def start_video_recording(
     duration: Optional[float] = None,
     playback_frame_rate: Optional[float] = None,
     decimation: Optional[int] = None,
-    user: dict = Depends(verify_jwt)
+    user: dict = Depends(verify_jwt),
+    camera: PixelinkCamera = Depends(get_connected_camera)
 ):
     """
     Start recording video from camera.
@@ -313,9 +471,6 @@ async def start_video_recording(
     """
     global video_recording_state
     
-    if not camera or not camera.is_connected:
-        raise HTTPException(status_code=503, detail="Camera not connected")
-    
     if video_recording_state["is_recording"]:
         raise HTTPException(status_code=409, detail="Already recording video")
     
@@ -326,14 +481,11 @@ async def start_video_recording(
         decimation = decimation if decimation is not None else settings.video_default_decimation
         
         # Generate filename with timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")[:-3]
+        timestamp = _file_timestamp()
         filename = f"recording_{timestamp}.{settings.video_format}"
         
-        videos_path = Path(settings.video_save_path)
-        videos_path.mkdir(parents=True, exist_ok=True)
-        
-        mp4_path = videos_path / filename
-        h264_path = videos_path / f"recording_{timestamp}.h264"
+        mp4_path = VIDEOS_PATH / filename
+        h264_path = VIDEOS_PATH / f"recording_{timestamp}.h264"
         
         # Start recording
         # NOTE: Camera will manage its own stream - do NOT pause the streamer!
@@ -353,7 +505,7 @@ async def start_video_recording(
             "metadata": result
         }
         
-        logger.info(f"Video recording started: {filename}")
+        logger.info("Video recording started: %s", filename)
         
         return {
             "success": True,
@@ -363,21 +515,19 @@ async def start_video_recording(
         }
         
     except Exception as e:
-        logger.error(f"Failed to start video recording: {e}", exc_info=True)
+        logger.error("Failed to start video recording: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/video/record/stop")
-async def stop_video_recording(user: dict = Depends(verify_jwt)):
+async def stop_video_recording(user: dict = Depends(verify_jwt),
+                               camera: PixelinkCamera = Depends(get_connected_camera)):
     """
     Stop recording video and finalize the file.
     Protected endpoint - requires JWT token.
     """
     global video_recording_state
     
-    if not camera or not camera.is_connected:
-        raise HTTPException(status_code=503, detail="Camera not connected")
-    
     if not video_recording_state["is_recording"]:
         raise HTTPException(status_code=409, detail="Not currently recording")
     
@@ -385,8 +535,11 @@ async def stop_video_recording(user: dict = Depends(verify_jwt)):
         h264_path = video_recording_state["h264_path"]
         mp4_path = video_recording_state["mp4_path"]
         
-        # Stop and finalize recording
-        result = camera.stop_video_recording(h264_path, mp4_path)
+        # Stop and finalize recording (waits for the SDK callback and converts
+        # H.264 -> MP4 on disk, so keep it off the event loop)
+        result = await asyncio.get_running_loop().run_in_executor(
+            capture_executor, camera.stop_video_recording, h264_path, mp4_path
+        )
         
         # Calculate duration
         start_time = video_recording_state["start_time"]
@@ -402,7 +555,7 @@ async def stop_video_recording(user: dict = Depends(verify_jwt)):
             "metadata": {}
         }
         
-        logger.info(f"Video recording stopped: {result['filename']} ({actual_duration:.1f}s)")
+        logger.info("Video recording stopped: %s (%.1fs)", result['filename'], actual_duration)
         
         # Get camera settings for metadata
         current_settings = camera.get_settings()
@@ -439,21 +592,19 @@ async def stop_video_recording(user: dict = Depends(verify_jwt)):
         if video_recording_state.get("streaming_was_active", False):
             await streamer.resume_streaming()
         
-        logger.error(f"Failed to stop video recording: {e}", exc_info=True)
+        logger.error("Failed to stop video recording: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/video/record/cancel")
-async def cancel_video_recording(user: dict = Depends(verify_jwt)):
+async def cancel_video_recording(user: dict = Depends(verify_jwt),
+                                 camera: PixelinkCamera = Depends(get_connected_camera)):
     """
     Cancel ongoing video recording.
     Protected endpoint - requires JWT token.
     """
     global video_recording_state
     
-    if not camera or not camera.is_connected:
-        raise HTTPException(status_code=503, detail="Camera not connected")
-    
     if not video_recording_state["is_recording"]:
         return {"success": True, "message": "No recording in progress"}
     
@@ -461,16 +612,19 @@ async def cancel_video_recording(user: dict = Depends(verify_jwt)):
         streaming_was_active = video_recording_state.get("streaming_was_active", False)
         
         # Cancel recording
-        camera.cancel_video_recording()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(capture_executor, camera.cancel_video_recording)
         
         # Clean up temporary files
         h264_path = video_recording_state.get("h264_path")
-        if h264_path and h264_path.exists():
+        if h264_path:
             try:
-                h264_path.unlink()
-                logger.info(f"Deleted temporary H.264 file")
+                await loop.run_in_executor(capture_executor, h264_path.unlink)
+                logger.info("Deleted temporary H.264 file")
+            except FileNotFoundError:
+                pass
             except Exception as e:
-                logger.warning(f"Could not delete H.264 file: {e}")
+                logger.warning("Could not delete H.264 file: %s", e)
         
         # Reset state
         video_recording_state = {
@@ -491,7 +645,7 @@ async def cancel_video_recording(user: dict = Depends(verify_jwt)):
         }
         
     except Exception as e:
-        logger.error(f"Failed to cancel video recording: {e}", exc_info=True)
+        logger.error("Failed to cancel video recording: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -523,62 +677,84 @@ async def list_videos(user: dict = Depends(verify_jwt)):
     Protected endpoint - requires JWT token.
     """
     try:
-        videos_path = Path(settings.video_save_path)
-        if not videos_path.exists():
-            return {"files": [], "count": 0, "path": str(videos_path)}
-        
-        files = []
-        for file in sorted(videos_path.glob(f"*.{settings.video_format}"), reverse=True):
-            stat = file.stat()
-            files.append({
-                "filename": file.name,
-                "size": stat.st_size,
-                "modified": datetime.fromtimestamp(stat.st_mtime).isoformat()
-            })
+        try:
+            files = await asyncio.to_thread(_list_files, VIDEOS_PATH, f".{settings.video_format}", True)
+        except FileNotFoundError:
+            return {"files": [], "count": 0, "path": str(VIDEOS_PATH)}
         
         return {
             "files": files,
             "count": len(files),
-            "path": str(videos_path.absolute())
+            "path": str(VIDEOS_PATH.absolute())
         }
     except Exception as e:
-        logger.error(f"Error listing videos: {e}")
+        logger.error("Error listing videos: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _handle_stream_message(data: Union[str, bytes]):
+    """
+    Handle a control message from a streaming client.
+    
+    Supported messages:
+        {"type": "stream_scale", "value": 0.5, "token": "<jwt>"}  - downscale the live stream
+    
+    The stream scale is shared by every viewer, so changing it requires
+    the same JWT as the authenticated REST endpoints.
+    """
+    try:
+        message = orjson.loads(data)
+    except orjson.JSONDecodeError:
+        return
+    
+    if isinstance(message, dict) and message.get("type") == "stream_scale":
+        token = message.get("token")
+        try:
+            verify_jwt(HTTPAuthorizationCredentials(scheme="Bearer", credentials=token) if isinstance(token, str) else None)
+        except HTTPException as e:
+            logger.warning("Rejected stream_scale message: %s", e.detail)
+            return
+        try:
+            streamer.set_stream_scale(message["value"])
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning("Invalid stream_scale message: %s", e)
+
+
 @app.websocket("/ws/camera/stream")
 async def websocket_camera_stream(websocket: WebSocket):
     """
     WebSocket endpoint for live camera streaming.
-    Streams JPEG frames as base64-encoded JSON messages.
+    Streams JPEG frames as binary messages (8-byte float64 timestamp + JPEG).
+    Control messages (e.g. "connected") are sent as JSON text.
     
     Called by frontend to receive live camera feed.
     Multiple clients can connect simultaneously.
     """
-    import time
     start_time = time.time()
     print("[WEBSOCKET] Connection request received")
-    logger.info(f"⏱️ WebSocket endpoint called at {start_time}")
+    logger.info("⏱️ WebSocket endpoint called at %s", start_time)
     
     # Accept connection and send confirmation IMMEDIATELY
     await websocket.accept()
     accept_time = time.time()
     print(f"[WEBSOCKET] Connection accepted in {(accept_time - start_time)*1000:.1f}ms")
-    logger.info(f"⏱️ WebSocket accepted in {(accept_time - start_time)*1000:.1f}ms")
+    logger.info("⏱️ WebSocket accepted in %.1fms", (accept_time - start_time)*1000)
     
     client_info = f"{websocket.client.host}:{websocket.client.port}" if websocket.client else "unknown"
     print(f"[WEBSOCKET] Client: {client_info}")
-    logger.info(f"🔌 WebSocket client connected from {client_info}")
+    logger.info("🔌 WebSocket client connected from %s", client_info)
     
     # Send immediate connection confirmation (no delays)
-    await websocket.send_json({
+    camera = websocket.app.state.camera
+    # Sent as text: binary messages are reserved for frames
+    await websocket.send_text(orjson.dumps({
         "type": "connected",
         "message": "Connected",
         "resolution": {"width": camera.width, "height": camera.height}
-    })
+    }).decode())
     send_time = time.time()
     print(f"[WEBSOCKET] Sent 'connected' message in {(send_time - accept_time)*1000:.1f}ms")
-    logger.info(f"⏱️ Sent connected message in {(send_time - accept_time)*1000:.1f}ms")
+    logger.info("⏱️ Sent connected message in %.1fms", (send_time - accept_time)*1000)
     
     try:
         # Register this client with the streamer (now truly non-blocking)
@@ -586,47 +762,52 @@ async def websocket_camera_stream(websocket: WebSocket):
         register_time = time.time()
         print(f"[WEBSOCKET] Client registered in {(register_time - send_time)*1000:.1f}ms")
         print(f"[WEBSOCKET] TOTAL connection time: {(register_time - start_time)*1000:.1f}ms")
-        logger.info(f"⏱️ Client registered in {(register_time - send_time)*1000:.1f}ms")
-        logger.info(f"⏱️ TOTAL connection time: {(register_time - start_time)*1000:.1f}ms")
+        logger.info("⏱️ Client registered in %.1fms", (register_time - send_time)*1000)
+        logger.info("⏱️ TOTAL connection time: %.1fms", (register_time - start_time)*1000)
         
         # Keep connection alive and handle incoming messages
         while True:
             # Wait for messages from client (like settings updates, close, etc.)
             try:
-                data = await websocket.receive_text()
-                # Handle client messages if needed
-                logger.debug(f"Received from client: {data}")
+                # Raw ASGI receive: text or binary, with no forced UTF-8 decode
+                message = await websocket.receive()
+                if message["type"] == "websocket.disconnect":
+                    raise WebSocketDisconnect(message.get("code", 1000))
+                data = message.get("text")
+                if data is None:
+                    data = message.get("bytes")
+                if data:
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Received from client: %r", data)
+                    _handle_stream_message(data)
             except WebSocketDisconnect:
-                logger.info(f"🔌 WebSocket client {client_info} disconnected (receive)")
+                logger.info("🔌 WebSocket client %s disconnected (receive)", client_info)
                 break
             except Exception as e:
-                logger.warning(f"Error receiving from client {client_info}: {e}")
+                logger.warning("Error receiving from client %s: %s", client_info, e)
                 break
                 
     except WebSocketDisconnect:
-        logger.info(f"🔌 WebSocket client {client_info} disconnected normally")
+        logger.info("🔌 WebSocket client %s disconnected normally", client_info)
     except Exception as e:
-        logger.error(f"❌ WebSocket error for client {client_info}: {e}", exc_info=True)
+        logger.error("❌ WebSocket error for client %s: %s", client_info, e, exc_info=True)
     finally:
         # Unregister client
         await streamer.remove_client(websocket)
-        logger.info(f"✅ WebSocket client {client_info} removed. Active clients: {len(streamer.active_clients)}")
+        logger.info("✅ WebSocket client %s removed. Active clients: %s", client_info, len(streamer.active_clients))
 
 
 # Mount static files for captured images
 # IMPORTANT: This must come AFTER all API endpoints to avoid conflicts
 # Now accessible via http://localhost:8001/captures/filename.jpg
-captures_path = Path(settings.image_save_path)
-videos_path = Path(settings.video_save_path)
-
-for media_path in (captures_path, videos_path):
+for media_path in (CAPTURES_PATH, VIDEOS_PATH):
     media_path.mkdir(parents=True, exist_ok=True)
 
-app.mount("/captures", StaticFiles(directory=str(captures_path)), name="captures")
-logger.info(f"📁 Static files mounted: /captures -> {captures_path.absolute()}")
+app.mount("/captures", ImmutableStaticFiles(directory=str(CAPTURES_PATH)), name="captures")
+logger.info("📁 Static files mounted: /captures -> %s", CAPTURES_PATH.absolute())
 
-app.mount("/videos", StaticFiles(directory=str(videos_path)), name="videos")
-logger.info(f"📁 Static files mounted: /videos -> {videos_path.absolute()}")
+app.mount("/videos", ImmutableStaticFiles(directory=str(VIDEOS_PATH)), name="videos")
+logger.info("📁 Static files mounted: /videos -> %s", VIDEOS_PATH.absolute())
 
 
 # Main entry point
@@ -637,6 +818,7 @@ if __name__ == "__main__":
         "main:app",
         host=settings.host,
         port=settings.port,
+        ws_per_message_deflate=False,  # Frames are JPEG: deflate costs CPU and saves nothing
         reload=False,  # Disable reload to reduce noise
         log_level="info",  # Force INFO level
         access_log=False  # Disable access logs
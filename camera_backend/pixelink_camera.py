@@ -4,10 +4,12 @@ Pixelink Camera Wrapper
 Provides interface to Pixelink SDK for camera control
 """
 
+import io
 import logging
 import os
-import sys
-from typing import Optional, Dict
+from types import MappingProxyType
+from typing import Any, Optional, Dict, List, Mapping, Tuple
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime
 from pathlib import Path
 import numpy as np
@@ -19,18 +21,75 @@ import time
 from camera_utils import (
     PIXELINK_AVAILABLE,
     PxLApi,
+    api_success,
     determine_raw_image_size,
     capture_frame,
+    encode_jpeg,
+    gamma_lut,
+    apply_lut,
     generate_simulated_frame
 )
 
 logger = logging.getLogger(__name__)
 
+# Feature ids/flags resolved once rather than through PxLApi attribute chains per call
+if PIXELINK_AVAILABLE:
+    _FF_AUTO = PxLApi.FeatureFlags.AUTO
+    _FF_MANUAL = PxLApi.FeatureFlags.MANUAL
+    _FF_ONEPUSH = PxLApi.FeatureFlags.ONEPUSH
+    _FF_PRESENCE = PxLApi.FeatureFlags.PRESENCE
+    _FID_ACTUAL_FRAME_RATE = PxLApi.FeatureId.ACTUAL_FRAME_RATE
+    _FID_ALL = PxLApi.FeatureId.ALL
+    _FID_EXPOSURE = PxLApi.FeatureId.EXPOSURE
+    _FID_FRAME_RATE = PxLApi.FeatureId.FRAME_RATE
+    _FID_GAIN = PxLApi.FeatureId.GAIN
+    _FID_GAMMA = PxLApi.FeatureId.GAMMA
+else:
+    _FF_AUTO = _FF_MANUAL = _FF_ONEPUSH = _FF_PRESENCE = None
+    _FID_ACTUAL_FRAME_RATE = _FID_ALL = _FID_EXPOSURE = _FID_FRAME_RATE = _FID_GAIN = _FID_GAMMA = None
+
+JPEG_SUFFIXES = ('.jpg', '.jpeg')
+
+# setStreamState(START) on a running stream; treated as success
+_API_ALREADY_STREAMING = -2147483644
+
+
+def _write_file(path: Path, data: bytes):
+    """Write a whole buffer with raw os.write calls (no buffered file object)."""
+    view = memoryview(data)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0), 0o644)
+    try:
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
 
 class PixelinkCamera:
     """Wrapper for PixeLink camera operations"""
     
+    # Fixed attribute layout: no per-instance __dict__, slot access for hot attributes
+    __slots__ = (
+        'serial_number', 'camera_handle', 'is_connected', 'is_streaming',
+        'exposure', 'exposure_min', 'exposure_max',
+        'gain', 'gain_min', 'gain_max',
+        'gamma', 'gamma_min', 'gamma_max', 'gamma_supported',
+        'auto_exposure_enabled', 'auto_exposure_supported',
+        'width', 'height',
+        '_settings_cache', '_settings_lock', '_raw_image_size', '_raw_buffer', '_capture_lock',
+        '_stream_lock', '_stream_refs', '_sim_frame', '_gamma_lut', '_io_pool',
+        # Video recording state (see __init_video_recording_vars)
+        'is_recording', 'recording_thread', 'num_images_streamed',
+        'capture_rc', 'capture_finished', 'video_callback',
+    )
+    
     def __init__(self, serial_number: Optional[str] = None):
+        # Read-only settings snapshot; built under _settings_lock, see get_settings()
+        self._settings_cache: Optional[Mapping[str, Any]] = None
+        self._settings_lock = threading.Lock()
+        # Initialize video recording variables first
+        self.__init_video_recording_vars()
+        
         self.serial_number = serial_number
         self.camera_handle = None
         self.is_connected = False
@@ -42,6 +101,20 @@ class PixelinkCamera:
         self.gamma = 1.0  # Default gamma value
         self.width = 1280
         self.height = 1024
+        # Cached (width, height, bytes_per_pixel) of raw frames; see _get_raw_image_size()
+        self._raw_image_size: Optional[Tuple[int, int, int]] = None
+        # Reused raw frame buffer; the lock serializes captures that share it
+        self._raw_buffer: Optional[np.ndarray] = None
+        self._capture_lock = threading.Lock()
+        # Serializes stream START/STOP; _stream_refs counts acquire_stream() holders
+        self._stream_lock = threading.Lock()
+        self._stream_refs = 0
+        # Reused output buffer for simulated captures
+        self._sim_frame: Optional[np.ndarray] = None
+        # Software gamma table, used only when the camera has no GAMMA feature
+        self._gamma_lut: Optional[np.ndarray] = None
+        # Encodes and writes burst frames while the next frame is grabbed
+        self._io_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="capture-io")
         
         # Exposure limits (in milliseconds)
         self.exposure_min = 0.001  # 1 microsecond
@@ -60,7 +133,7 @@ class PixelinkCamera:
         self.auto_exposure_enabled = False
         self.auto_exposure_supported = False  # Will be set during initialization
         
-        logger.info(f"PixelinkCamera initializing... PIXELINK_AVAILABLE={PIXELINK_AVAILABLE}")
+        logger.info("PixelinkCamera initializing... PIXELINK_AVAILABLE=%s", PIXELINK_AVAILABLE)
         
         if PIXELINK_AVAILABLE:
             self._initialize_camera()
@@ -73,17 +146,19 @@ class PixelinkCamera:
             camera_id = int(self.serial_number) if self.serial_number else 0
             ret = PxLApi.initialize(camera_id)
             
-            if PxLApi.apiSuccess(ret[0]):
+            if api_success(ret[0]):
                 self.camera_handle = ret[1]
                 self.is_connected = True
+                self._invalidate_settings()
                 logger.info("Camera initialized")
                 self._load_current_settings()
+                self._prepare_capture_buffers()
                 return True
             else:
-                logger.error(f"Failed to initialize camera: {ret[0]}")
+                logger.error("Failed to initialize camera: %s", ret[0])
                 return False
         except Exception as e:
-            logger.error(f"Camera init error: {e}")
+            logger.error("Camera init error: %s", e)
             return False
     
     def _load_current_settings(self):
@@ -91,28 +166,33 @@ class PixelinkCamera:
         if not PIXELINK_AVAILABLE or not self.is_connected:
             return
         try:
-            # Get exposure limits from camera features
-            ret = PxLApi.getCameraFeatures(self.camera_handle, PxLApi.FeatureId.EXPOSURE)
-            if PxLApi.apiSuccess(ret[0]):
+            # Read every feature's limits/flags in one SDK call and index them by id
+            limits = {}
+            ret = PxLApi.getCameraFeatures(self.camera_handle, _FID_ALL)
+            if api_success(ret[0]):
                 features = ret[1]
-                if features.uNumberOfFeatures > 0:
-                    feature = features.Features[0]
-                    if feature.uFlags & PxLApi.FeatureFlags.PRESENCE:
-                        # Exposure limits are in SECONDS, convert to milliseconds
-                        self.exposure_min = feature.Params[0].fMinValue * 1000.0
-                        self.exposure_max = feature.Params[0].fMaxValue * 1000.0
-                        logger.info(f"📏 Exposure range: {self.exposure_min:.3f}ms - {self.exposure_max:.3f}ms")
-                        
-                        # Check if auto-exposure is supported
-                        self.auto_exposure_supported = bool(
-                            (feature.uFlags & PxLApi.FeatureFlags.AUTO) or
-                            (feature.uFlags & PxLApi.FeatureFlags.ONEPUSH)
-                        )
-                        logger.info(f"🤖 Auto-exposure supported: {self.auto_exposure_supported}")
+                for feature in features.Features[:features.uNumberOfFeatures]:
+                    if feature.uFlags & _FF_PRESENCE:
+                        limits[feature.uFeatureId] = feature
+            
+            # Exposure limits
+            feature = limits.get(_FID_EXPOSURE)
+            if feature is not None:
+                # Exposure limits are in SECONDS, convert to milliseconds
+                self.exposure_min = feature.Params[0].fMinValue * 1000.0
+                self.exposure_max = feature.Params[0].fMaxValue * 1000.0
+                logger.info("📏 Exposure range: %.3fms - %.3fms", self.exposure_min, self.exposure_max)
+                
+                # Check if auto-exposure is supported
+                self.auto_exposure_supported = bool(
+                    (feature.uFlags & _FF_AUTO) or
+                    (feature.uFlags & _FF_ONEPUSH)
+                )
+                logger.info("🤖 Auto-exposure supported: %s", self.auto_exposure_supported)
             
             # Get current exposure value
-            ret = PxLApi.getFeature(self.camera_handle, PxLApi.FeatureId.EXPOSURE)
-            if PxLApi.apiSuccess(ret[0]):
+            ret = PxLApi.getFeature(self.camera_handle, _FID_EXPOSURE)
+            if api_success(ret[0]):
                 flags = ret[1]
                 params = ret[2]
                 # PixeLink API returns exposure in SECONDS
@@ -120,54 +200,69 @@ class PixelinkCamera:
                 self.exposure = exposure_seconds * 1000.0  # Convert to milliseconds
                 
                 # Check if auto-exposure is enabled
-                self.auto_exposure_enabled = bool(flags & PxLApi.FeatureFlags.AUTO)
+                self.auto_exposure_enabled = bool(flags & _FF_AUTO)
                 
-                logger.info(f"📸 Current exposure: {self.exposure:.3f}ms ({exposure_seconds:.6f}s)")
-                logger.info(f"🤖 Auto-exposure: {'ENABLED' if self.auto_exposure_enabled else 'DISABLED'}")
+                logger.info("📸 Current exposure: %.3fms (%.6fs)", self.exposure, exposure_seconds)
+                logger.info("🤖 Auto-exposure: %s", 'ENABLED' if self.auto_exposure_enabled else 'DISABLED')
             
-            # Get gain limits
-            ret = PxLApi.getCameraFeatures(self.camera_handle, PxLApi.FeatureId.GAIN)
-            if PxLApi.apiSuccess(ret[0]):
-                features = ret[1]
-                if features.uNumberOfFeatures > 0:
-                    feature = features.Features[0]
-                    if feature.uFlags & PxLApi.FeatureFlags.PRESENCE:
-                        self.gain_min = feature.Params[0].fMinValue
-                        self.gain_max = feature.Params[0].fMaxValue
-                        logger.info(f"📏 Gain range: {self.gain_min:.2f} - {self.gain_max:.2f}")
+            # Gain limits
+            feature = limits.get(_FID_GAIN)
+            if feature is not None:
+                self.gain_min = feature.Params[0].fMinValue
+                self.gain_max = feature.Params[0].fMaxValue
+                logger.info("📏 Gain range: %.2f - %.2f", self.gain_min, self.gain_max)
             
             # Get current gain
-            ret = PxLApi.getFeature(self.camera_handle, PxLApi.FeatureId.GAIN)
-            if PxLApi.apiSuccess(ret[0]):
+            ret = PxLApi.getFeature(self.camera_handle, _FID_GAIN)
+            if api_success(ret[0]):
                 self.gain = ret[2][0]
-                logger.info(f"📸 Current gain: {self.gain:.2f}")
+                logger.info("📸 Current gain: %.2f", self.gain)
             
-            # Get gamma limits
-            ret = PxLApi.getCameraFeatures(self.camera_handle, PxLApi.FeatureId.GAMMA)
-            if PxLApi.apiSuccess(ret[0]):
-                features = ret[1]
-                if features.uNumberOfFeatures > 0:
-                    feature = features.Features[0]
-                    if feature.uFlags & PxLApi.FeatureFlags.PRESENCE:
-                        self.gamma_min = feature.Params[0].fMinValue
-                        self.gamma_max = feature.Params[0].fMaxValue
-                        self.gamma_supported = True
-                        logger.info(f"📏 Gamma range: {self.gamma_min:.2f} - {self.gamma_max:.2f}")
-                    else:
-                        logger.info("⚠️ Gamma feature not supported by this camera")
+            # Gamma limits
+            feature = limits.get(_FID_GAMMA)
+            if feature is not None:
+                self.gamma_min = feature.Params[0].fMinValue
+                self.gamma_max = feature.Params[0].fMaxValue
+                self.gamma_supported = True
+                logger.info("📏 Gamma range: %.2f - %.2f", self.gamma_min, self.gamma_max)
+            else:
+                logger.info("⚠️ Gamma feature not supported by this camera")
             
             # Get current gamma if supported
             if self.gamma_supported:
-                ret = PxLApi.getFeature(self.camera_handle, PxLApi.FeatureId.GAMMA)
-                if PxLApi.apiSuccess(ret[0]):
+                ret = PxLApi.getFeature(self.camera_handle, _FID_GAMMA)
+                if api_success(ret[0]):
                     self.gamma = ret[2][0]
-                    logger.info(f"📸 Current gamma: {self.gamma:.2f}")
+                    logger.info("📸 Current gamma: %.2f", self.gamma)
                 
         except Exception as e:
-            logger.error(f"Error loading settings: {e}")
+            logger.error("Error loading settings: %s", e)
+        self._invalidate_settings()
     
-    def get_settings(self) -> Dict:
-        return {
+    def get_settings(self) -> Mapping[str, Any]:
+        """
+        Current settings and limits as a read-only mapping.
+        
+        The snapshot is cached until a method that changes a reported
+        attribute calls _invalidate_settings(). Building and invalidating both
+        take _settings_lock, and setters invalidate after writing, so a
+        snapshot built from old values can't outlive the change.
+        """
+        cache = self._settings_cache
+        if cache is not None:
+            return cache
+        with self._settings_lock:
+            if self._settings_cache is None:
+                self._settings_cache = self._build_settings()
+            return self._settings_cache
+    
+    def _invalidate_settings(self):
+        """Drop the cached get_settings() snapshot after a reported attribute changed."""
+        with self._settings_lock:
+            self._settings_cache = None
+    
+    def _build_settings(self) -> Mapping[str, Any]:
+        return MappingProxyType({
             "exposure": self.exposure,
             "exposureMin": self.exposure_min,
             "exposureMax": self.exposure_max,
@@ -180,13 +275,13 @@ class PixelinkCamera:
             "gammaSupported": self.gamma_supported,
             "autoExposure": self.auto_exposure_enabled,
             "autoExposureSupported": self.auto_exposure_supported,
-            "resolution": {"width": self.width, "height": self.height},
+            "resolution": MappingProxyType({"width": self.width, "height": self.height}),
             "connected": self.is_connected,
             "streaming": self.is_streaming
-        }
+        })
     
     def update_settings(self, exposure: Optional[float] = None, gain: Optional[float] = None, 
-                       gamma: Optional[float] = None, auto_exposure: Optional[bool] = None) -> Dict:
+                       gamma: Optional[float] = None, auto_exposure: Optional[bool] = None) -> Mapping[str, Any]:
         """
         Update camera settings.
         
@@ -219,96 +314,117 @@ class PixelinkCamera:
         if PIXELINK_AVAILABLE and self.is_connected:
             try:
                 # Clamp exposure to valid range
-                exposure_ms = max(self.exposure_min, min(exposure_ms, self.exposure_max))
+                lo, hi = self.exposure_min, self.exposure_max
+                exposure_ms = lo if exposure_ms < lo else hi if exposure_ms > hi else exposure_ms
+                if exposure_ms == self.exposure and not self.auto_exposure_enabled:
+                    return  # Already applied in manual mode; skip the SDK round-trip
                 
                 # Convert milliseconds to seconds for PixeLink API
                 exposure_seconds = exposure_ms / 1000.0
                 
-                logger.info(f"🎯 Setting exposure to {exposure_ms:.3f}ms ({exposure_seconds:.6f}s)")
+                logger.info("🎯 Setting exposure to %.3fms (%.6fs)", exposure_ms, exposure_seconds)
                 
                 ret = PxLApi.setFeature(
                     self.camera_handle,
-                    PxLApi.FeatureId.EXPOSURE,
-                    PxLApi.FeatureFlags.MANUAL,
+                    _FID_EXPOSURE,
+                    _FF_MANUAL,
                     [exposure_seconds]  # PixeLink expects SECONDS
                 )
                 
-                if PxLApi.apiSuccess(ret[0]):
+                if api_success(ret[0]):
                     self.exposure = exposure_ms
                     self.auto_exposure_enabled = False
-                    logger.info(f"✅ Exposure set successfully to {self.exposure:.3f}ms")
+                    self._invalidate_settings()
+                    logger.info("✅ Exposure set successfully to %.3fms", self.exposure)
                 else:
                     error_code = ret[0]
-                    logger.error(f"❌ Failed to set exposure. Error code: {error_code}")
-                    logger.error(f"   Requested: {exposure_ms:.3f}ms ({exposure_seconds:.6f}s)")
-                    logger.error(f"   Valid range: {self.exposure_min:.3f}ms - {self.exposure_max:.3f}ms")
+                    logger.error("❌ Failed to set exposure. Error code: %s", error_code)
+                    logger.error("   Requested: %.3fms (%.6fs)", exposure_ms, exposure_seconds)
+                    logger.error("   Valid range: %.3fms - %.3fms", self.exposure_min, self.exposure_max)
                     
             except Exception as e:
-                logger.error(f"Exception setting exposure: {e}")
+                logger.error("Exception setting exposure: %s", e)
         else:
             # Simulated mode - just update the value
             self.exposure = exposure_ms
-            logger.info(f"🎭 [SIMULATED] Exposure set to {self.exposure:.3f}ms")
+            self._invalidate_settings()
+            logger.info("🎭 [SIMULATED] Exposure set to %.3fms", self.exposure)
     
     def _set_gain(self, gain: float):
         """Set camera gain"""
         if PIXELINK_AVAILABLE and self.is_connected:
             try:
                 # Clamp gain to valid range
-                gain = max(self.gain_min, min(gain, self.gain_max))
+                lo, hi = self.gain_min, self.gain_max
+                gain = lo if gain < lo else hi if gain > hi else gain
+                if gain == self.gain:
+                    return  # Already applied; skip the SDK round-trip
                 
-                logger.info(f"🎯 Setting gain to {gain:.2f}")
+                logger.info("🎯 Setting gain to %.2f", gain)
                 
                 ret = PxLApi.setFeature(
                     self.camera_handle,
-                    PxLApi.FeatureId.GAIN,
-                    PxLApi.FeatureFlags.MANUAL,
+                    _FID_GAIN,
+                    _FF_MANUAL,
                     [gain]
                 )
                 
-                if PxLApi.apiSuccess(ret[0]):
+                if api_success(ret[0]):
                     self.gain = gain
-                    logger.info(f"✅ Gain set successfully to {self.gain:.2f}")
+                    self._invalidate_settings()
+                    logger.info("✅ Gain set successfully to %.2f", self.gain)
                 else:
-                    logger.error(f"❌ Failed to set gain. Error code: {ret[0]}")
+                    logger.error("❌ Failed to set gain. Error code: %s", ret[0])
                     
             except Exception as e:
-                logger.error(f"Exception setting gain: {e}")
+                logger.error("Exception setting gain: %s", e)
         else:
             self.gain = gain
-            logger.info(f"🎭 [SIMULATED] Gain set to {self.gain:.2f}")
+            self._invalidate_settings()
+            logger.info("🎭 [SIMULATED] Gain set to %.2f", self.gain)
     
     def _set_gamma(self, gamma: float):
         """Set camera gamma"""
         if PIXELINK_AVAILABLE and self.is_connected:
             if not self.gamma_supported:
-                logger.warning("⚠️ Gamma not supported by this camera")
+                # No hardware gamma: apply it to captured frames via a LUT instead
+                lo, hi = self.gamma_min, self.gamma_max
+                gamma = lo if gamma < lo else hi if gamma > hi else gamma
+                self._gamma_lut = None if gamma == 1.0 else gamma_lut(gamma)
+                self.gamma = gamma
+                self._invalidate_settings()
+                logger.info("🎯 Gamma set to %.2f (software)", self.gamma)
                 return
             
             try:
                 # Clamp gamma to valid range
-                gamma = max(self.gamma_min, min(gamma, self.gamma_max))
+                lo, hi = self.gamma_min, self.gamma_max
+                gamma = lo if gamma < lo else hi if gamma > hi else gamma
+                if gamma == self.gamma:
+                    return  # Already applied; skip the SDK round-trip
                 
-                logger.info(f"🎯 Setting gamma to {gamma:.2f}")
+                logger.info("🎯 Setting gamma to %.2f", gamma)
                 
                 ret = PxLApi.setFeature(
                     self.camera_handle,
-                    PxLApi.FeatureId.GAMMA,
-                    PxLApi.FeatureFlags.MANUAL,
+                    _FID_GAMMA,
+                    _FF_MANUAL,
                     [gamma]
                 )
                 
-                if PxLApi.apiSuccess(ret[0]):
+                if api_success(ret[0]):
                     self.gamma = gamma
-                    logger.info(f"✅ Gamma set successfully to {self.gamma:.2f}")
+                    self._invalidate_settings()
+                    logger.info("✅ Gamma set successfully to %.2f", self.gamma)
                 else:
-                    logger.error(f"❌ Failed to set gamma. Error code: {ret[0]}")
+                    logger.error("❌ Failed to set gamma. Error code: %s", ret[0])
                     
             except Exception as e:
-                logger.error(f"Exception setting gamma: {e}")
+                logger.error("Exception setting gamma: %s", e)
         else:
             self.gamma = gamma
-            logger.info(f"🎭 [SIMULATED] Gamma set to {self.gamma:.2f}")
+            self._invalidate_settings()
+            logger.info("🎭 [SIMULATED] Gamma set to %.2f", self.gamma)
     
     def _set_auto_exposure(self, enabled: bool):
         """Enable or disable continuous auto-exposure"""
@@ -322,20 +438,9 @@ class PixelinkCamera:
             try:
                 # CRITICAL: Camera must be streaming for auto-exposure to work!
                 # Start streaming if not already streaming
-                was_streaming = self.is_streaming
-                logger.info(f"🔍 Auto-exposure request - Current streaming state: {self.is_streaming}")
-                
-                if not was_streaming:
-                    logger.info("📹 Starting stream for auto-exposure...")
-                    ret = PxLApi.setStreamState(self.camera_handle, PxLApi.StreamState.START)
-                    if PxLApi.apiSuccess(ret[0]):
-                        self.is_streaming = True
-                        logger.info(f"✅ Stream started successfully for auto-exposure")
-                    else:
-                        logger.error(f"❌ Failed to start stream. Error: {ret[0]}")
-                        return
-                else:
-                    logger.info("✓ Camera already streaming, proceeding with auto-exposure")
+                logger.info("🔍 Auto-exposure request - Current streaming state: %s", self.is_streaming)
+                if not self._ensure_streaming("auto-exposure"):
+                    return
                 
                 if enabled:
                     # Enable continuous auto-exposure
@@ -343,43 +448,45 @@ class PixelinkCamera:
                     
                     # NOTE: Even though value is ignored for AUTO, we still need to pass params array
                     # Get current exposure first (sample code does this)
-                    ret = PxLApi.getFeature(self.camera_handle, PxLApi.FeatureId.EXPOSURE)
-                    if PxLApi.apiSuccess(ret[0]):
+                    ret = PxLApi.getFeature(self.camera_handle, _FID_EXPOSURE)
+                    if api_success(ret[0]):
                         params = ret[2]  # Use current params
                     else:
                         params = [0.0]  # Fallback to 0
                     
                     ret = PxLApi.setFeature(
                         self.camera_handle,
-                        PxLApi.FeatureId.EXPOSURE,
-                        PxLApi.FeatureFlags.AUTO,
+                        _FID_EXPOSURE,
+                        _FF_AUTO,
                         params  # Pass actual params array, not [0.0]
                     )
                 else:
                     # Disable auto-exposure (switch to manual)
                     # Read current exposure value first (as set by camera during AUTO)
-                    ret = PxLApi.getFeature(self.camera_handle, PxLApi.FeatureId.EXPOSURE)
-                    if PxLApi.apiSuccess(ret[0]):
+                    ret = PxLApi.getFeature(self.camera_handle, _FID_EXPOSURE)
+                    if api_success(ret[0]):
                         params = ret[2]  # Use current params from camera
                         current_exposure_seconds = params[0]
                         self.exposure = current_exposure_seconds * 1000.0
+                        self._invalidate_settings()
                     else:
                         logger.error("Failed to get current exposure")
                         return
                     
-                    logger.info(f"👤 Switching to MANUAL exposure at {self.exposure:.3f}ms...")
+                    logger.info("👤 Switching to MANUAL exposure at %.3fms...", self.exposure)
                     ret = PxLApi.setFeature(
                         self.camera_handle,
-                        PxLApi.FeatureId.EXPOSURE,
-                        PxLApi.FeatureFlags.MANUAL,
+                        _FID_EXPOSURE,
+                        _FF_MANUAL,
                         params  # Use the params we just read
                     )
                 
-                if PxLApi.apiSuccess(ret[0]):
+                if api_success(ret[0]):
                     self.auto_exposure_enabled = enabled
-                    logger.info(f"✅ Auto-exposure {'ENABLED' if enabled else 'DISABLED'}")
+                    self._invalidate_settings()
+                    logger.info("✅ Auto-exposure %s", 'ENABLED' if enabled else 'DISABLED')
                 else:
-                    logger.error(f"❌ Failed to set auto-exposure. Error code: {ret[0]}")
+                    logger.error("❌ Failed to set auto-exposure. Error code: %s", ret[0])
                     if ret[0] == -2147483645:
                         logger.error("   This error typically means:")
                         logger.error("   - Camera doesn't support this auto-exposure mode")
@@ -390,10 +497,11 @@ class PixelinkCamera:
                 # Don't stop streaming here as it may be used by live feed
                     
             except Exception as e:
-                logger.error(f"Exception setting auto-exposure: {e}")
+                logger.error("Exception setting auto-exposure: %s", e)
         else:
             self.auto_exposure_enabled = enabled
-            logger.info(f"🎭 [SIMULATED] Auto-exposure {'ENABLED' if enabled else 'DISABLED'}")
+            self._invalidate_settings()
+            logger.info("🎭 [SIMULATED] Auto-exposure %s", 'ENABLED' if enabled else 'DISABLED')
     
     def perform_one_time_auto_exposure(self) -> bool:
         """
@@ -414,27 +522,16 @@ class PixelinkCamera:
         
         try:
             # CRITICAL: Camera must be streaming for auto-exposure to work!
-            was_streaming = self.is_streaming
-            logger.info(f"🔍 One-time auto-exposure - Current streaming state: {self.is_streaming}")
-            
-            if not was_streaming:
-                logger.info("📹 Starting stream for one-time auto-exposure...")
-                ret = PxLApi.setStreamState(self.camera_handle, PxLApi.StreamState.START)
-                if PxLApi.apiSuccess(ret[0]):
-                    self.is_streaming = True
-                    logger.info(f"✅ Stream started successfully for one-time auto-exposure")
-                else:
-                    logger.error(f"❌ Failed to start stream. Error: {ret[0]}")
-                    return False
-            else:
-                logger.info("✓ Camera already streaming, proceeding with one-time auto-exposure")
+            logger.info("🔍 One-time auto-exposure - Current streaming state: %s", self.is_streaming)
+            if not self._ensure_streaming("one-time auto-exposure"):
+                return False
             
             logger.info("🎯 Starting ONE-TIME auto-exposure adjustment...")
             
             # NOTE: Even though value is ignored for ONEPUSH, we still need to pass params array
             # Get current exposure first (sample code does this)
-            ret = PxLApi.getFeature(self.camera_handle, PxLApi.FeatureId.EXPOSURE)
-            if PxLApi.apiSuccess(ret[0]):
+            ret = PxLApi.getFeature(self.camera_handle, _FID_EXPOSURE)
+            if api_success(ret[0]):
                 params = ret[2]  # Use current params
             else:
                 params = [0.0]  # Fallback to 0
@@ -442,49 +539,49 @@ class PixelinkCamera:
             # Initiate one-time auto-exposure
             ret = PxLApi.setFeature(
                 self.camera_handle,
-                PxLApi.FeatureId.EXPOSURE,
-                PxLApi.FeatureFlags.ONEPUSH,
+                _FID_EXPOSURE,
+                _FF_ONEPUSH,
                 params  # Pass actual params array, not [0.0]
             )
             
-            if not PxLApi.apiSuccess(ret[0]):
-                logger.error(f"❌ Failed to initiate one-time auto-exposure. Error: {ret[0]}")
+            if not api_success(ret[0]):
+                logger.error("❌ Failed to initiate one-time auto-exposure. Error: %s", ret[0])
                 if ret[0] == -2147483645:
                     logger.error("   Camera may not support ONEPUSH auto-exposure")
                     logger.error("   Or camera is not streaming (required for auto-exposure)")
                 return False
             
-            # Poll until operation completes (with timeout)
-            import time
-            max_wait = 5.0  # 5 second timeout
-            poll_interval = 0.1  # 100ms
-            elapsed = 0.0
+            # Poll until operation completes (with timeout), backing off from
+            # 5ms to 50ms so typical fast convergence is noticed quickly
+            deadline = time.monotonic() + 5.0  # 5 second timeout
+            poll_interval = 0.005
             
-            while elapsed < max_wait:
-                ret = PxLApi.getFeature(self.camera_handle, PxLApi.FeatureId.EXPOSURE)
-                if PxLApi.apiSuccess(ret[0]):
+            while time.monotonic() < deadline:
+                ret = PxLApi.getFeature(self.camera_handle, _FID_EXPOSURE)
+                if api_success(ret[0]):
                     flags = ret[1]
                     params = ret[2]
                     
                     # Check if ONEPUSH flag is cleared (operation complete)
-                    if not (flags & PxLApi.FeatureFlags.ONEPUSH):
+                    if not (flags & _FF_ONEPUSH):
                         # Operation complete - read final exposure value
                         exposure_seconds = params[0]
                         self.exposure = exposure_seconds * 1000.0
                         self.auto_exposure_enabled = False
-                        logger.info(f"✅ One-time auto-exposure complete! New exposure: {self.exposure:.3f}ms")
+                        self._invalidate_settings()
+                        logger.info("✅ One-time auto-exposure complete! New exposure: %.3fms", self.exposure)
                         
                         # Keep streaming active (streamer will manage it)
                         return True
                 
                 time.sleep(poll_interval)
-                elapsed += poll_interval
+                poll_interval = min(poll_interval * 1.5, 0.05)
             
             logger.warning("⏱️ One-time auto-exposure timed out")
             return False
             
         except Exception as e:
-            logger.error(f"Exception during one-time auto-exposure: {e}")
+            logger.error("Exception during one-time auto-exposure: %s", e)
             return False
     
     def capture_image(self, save_path: Path, exposure: Optional[float] = None, gain: Optional[float] = None, 
@@ -500,14 +597,60 @@ class PixelinkCamera:
             
         Returns metadata matching NestJS Image entity structure.
         """
+        image_data, info = self._grab_image(exposure, gain, gamma)
+        return self._save_image(image_data, save_path, info)
+    
+    def capture_burst(self, save_paths: List[Path], exposures: Optional[List[float]] = None,
+                      gain: Optional[float] = None, gamma: Optional[float] = None) -> List[Dict]:
+        """
+        Capture one image per save path, back-to-back.
+        
+        Each frame is JPEG-encoded and written on the I/O pool while the next
+        one is grabbed, so a burst costs about max(grab, encode + write) per
+        image instead of their sum. Gain/gamma are applied before the first
+        frame only; `exposures` optionally gives one exposure per image.
+        
+        Returns a list of capture_image()-style metadata, in order.
+        """
+        futures = []
+        try:
+            for i, save_path in enumerate(save_paths):
+                first = i == 0
+                image_data, info = self._grab_image(
+                    exposures[i] if exposures else None,
+                    gain if first else None,
+                    gamma if first else None
+                )
+                if info["simulated"]:
+                    # Simulated frames share one buffer that the next grab overwrites
+                    image_data = image_data.copy()
+                futures.append(self._io_pool.submit(self._save_image, image_data, save_path, info))
+        except Exception:
+            wait(futures)  # Don't leave writes running behind the error
+            raise
+        return [future.result() for future in futures]
+    
+    def drain(self):
+        """Wait for pending burst writes and release the I/O pool."""
+        self._io_pool.shutdown(wait=True)
+    
+    def _grab_image(self, exposure: Optional[float], gain: Optional[float],
+                    gamma: Optional[float]) -> Tuple[np.ndarray, Dict]:
+        """
+        Apply optional settings and grab one frame (real or simulated).
+        
+        Returns the RGB frame and a snapshot of the capture settings for
+        _save_image(), taken now so later setting changes don't leak in.
+        """
         # Update settings if provided (and auto-exposure is not enabled)
         if (exposure is not None or gain is not None or gamma is not None) and not self.auto_exposure_enabled:
             self.update_settings(exposure, gain, gamma)
         
-        timestamp = datetime.now()
+        # Raw ns clock on the grab path; formatted to ISO in _save_image
+        timestamp_ns = time.time_ns()
         
         # Capture image (real or simulated)
-        logger.info(f"🎥 Capture attempt - SDK Available: {PIXELINK_AVAILABLE}, Camera Connected: {self.is_connected}")
+        logger.info("🎥 Capture attempt - SDK Available: %s, Camera Connected: %s", PIXELINK_AVAILABLE, self.is_connected)
         if PIXELINK_AVAILABLE and self.is_connected:
             logger.info("📸 Using REAL camera")
             image_data = self._capture_real_image()
@@ -522,12 +665,32 @@ class PixelinkCamera:
         if image_data is None:
             raise RuntimeError("Failed to capture image")
         
-        # Save image to disk
-        image = Image.fromarray(image_data)
-        image.save(save_path, quality=95)
+        info = {
+            "timestamp_ns": timestamp_ns,
+            "exposure": self.exposure,
+            "gain": self.gain,
+            "gamma": self.gamma,
+            "connected": self.is_connected,
+            "simulated": not (PIXELINK_AVAILABLE and self.is_connected),
+            "autoExposure": self.auto_exposure_enabled
+        }
+        return image_data, info
+    
+    def _save_image(self, image_data: np.ndarray, save_path: Path, info: Dict) -> Dict:
+        """Encode and write a grabbed frame; returns metadata matching NestJS Image entity."""
+        # Encode to memory and write in one go; the file size is the buffer length
+        suffix = save_path.suffix.lower()
+        if suffix in JPEG_SUFFIXES:
+            data = encode_jpeg(image_data, quality=95, fast_dct=False)
+        else:
+            buffer = io.BytesIO()
+            Image.fromarray(image_data).save(
+                buffer, format=Image.registered_extensions().get(suffix), quality=95
+            )
+            data = buffer.getvalue()
+        _write_file(save_path, data)
         
-        # Get file size and dimensions
-        file_size = save_path.stat().st_size if save_path.exists() else 0
+        file_size = len(data)
         height, width = image_data.shape[:2]
         
         # Return metadata matching NestJS Image entity
@@ -535,19 +698,19 @@ class PixelinkCamera:
             "success": True,
             "filename": save_path.name,
             "filepath": str(save_path.absolute()),
-            "capturedAt": timestamp.isoformat(),
-            "exposureTime": self.exposure,  # Now in milliseconds
-            "gain": self.gain,
-            "gamma": self.gamma,
+            "capturedAt": datetime.fromtimestamp(info["timestamp_ns"] / 1e9).isoformat(),
+            "exposureTime": info["exposure"],  # Now in milliseconds
+            "gain": info["gain"],
+            "gamma": info["gamma"],
             "fileSize": file_size,
             "width": width,
             "height": height,
             "metadata": {
                 "format": save_path.suffix.upper().replace('.', ''),
                 "quality": 95,
-                "cameraConnected": self.is_connected,
-                "simulatedMode": not (PIXELINK_AVAILABLE and self.is_connected),
-                "autoExposure": self.auto_exposure_enabled
+                "cameraConnected": info["connected"],
+                "simulatedMode": info["simulated"],
+                "autoExposure": info["autoExposure"]
             }
         }
     
@@ -561,46 +724,162 @@ class PixelinkCamera:
         try:
             # Ensure camera stream is running
             if not self.is_streaming:
-                logger.info("📹 Starting camera stream for capture")
-                ret = PxLApi.setStreamState(self.camera_handle, PxLApi.StreamState.START)
-                if PxLApi.apiSuccess(ret[0]):
-                    self.is_streaming = True
-                    logger.info("✅ Stream started successfully")
-                    # Wait a bit for stream to stabilize
-                    time.sleep(0.2)
-                else:
-                    logger.error(f"❌ Failed to start stream. Error: {ret[0]}")
+                if not self._ensure_streaming("capture"):
                     return None
+                # Wait a bit for stream to stabilize
+                time.sleep(0.2)
             
-            # Determine and update cached dimensions
-            width, height, _ = determine_raw_image_size(self.camera_handle)
-            if width == 0 or height == 0:
+            image_size = self._get_raw_image_size()
+            if image_size is None:
                 logger.error("Failed to determine image size")
                 return None
             
-            self.width = width
-            self.height = height
+            if self._raw_buffer is None:
+                self._prepare_capture_buffers()
             
-            # Capture frame using shared utility (with 4 retries for image capture)
-            image_array = capture_frame(self.camera_handle, max_retries=4)
+            # Capture frame using shared utility (with 4 retries for image capture).
+            # The returned RGB array does not alias the raw buffer, so the
+            # buffer is free again as soon as capture_frame returns.
+            with self._capture_lock:
+                image_array = capture_frame(self.camera_handle, max_retries=4,
+                                            image_size=image_size, raw_buffer=self._raw_buffer)
             
             if image_array is not None:
-                logger.info(f"✅ Image captured successfully")
+                image_array = self.apply_software_gamma(image_array)
+                logger.info("✅ Image captured successfully")
             else:
-                logger.error(f"❌ Failed to capture image after retries")
+                logger.error("❌ Failed to capture image after retries")
             
             return image_array
             
         except Exception as e:
-            logger.error(f"Error capturing real image: {e}")
+            logger.error("Error capturing real image: %s", e)
             return None
     
+    def apply_software_gamma(self, frame: np.ndarray) -> np.ndarray:
+        """
+        Apply the software gamma LUT to a real camera frame.
+        
+        Returns the frame unchanged when the camera does gamma in hardware or
+        gamma is 1.0; otherwise a new array (the input may be read-only).
+        """
+        lut = self._gamma_lut
+        return frame if lut is None else apply_lut(frame, lut)
+    
+    def _ensure_streaming(self, purpose: str) -> bool:
+        """
+        Start the camera stream unless it is already running.
+        
+        The check and the START call happen under _stream_lock, so concurrent
+        captures/auto-exposure requests can't both issue setStreamState(START).
+        The stream is left running afterwards for later captures; it is stopped
+        when the last acquire_stream() holder releases it, or on disconnect.
+        
+        Returns:
+            True if the stream is running
+        """
+        with self._stream_lock:
+            return self._start_stream_locked(purpose)
+    
+    def acquire_stream(self, purpose: str) -> bool:
+        """
+        Take a reference on the hardware stream for a long-lived consumer
+        (the live streamer), starting the stream if needed.
+        
+        Every successful call must be paired with release_stream().
+        
+        Returns:
+            True if the stream is running and a reference was taken
+        """
+        if not (PIXELINK_AVAILABLE and self.is_connected):
+            return False
+        with self._stream_lock:
+            if not self._start_stream_locked(purpose):
+                return False
+            self._stream_refs += 1
+            return True
+    
+    def release_stream(self):
+        """
+        Drop a reference taken by acquire_stream(). The last release stops the
+        hardware stream; one-off captures restart it via _ensure_streaming().
+        """
+        with self._stream_lock:
+            if self._stream_refs == 0:
+                return
+            self._stream_refs -= 1
+            if self._stream_refs or not self.is_streaming:
+                return
+            ret = PxLApi.setStreamState(self.camera_handle, PxLApi.StreamState.STOP)
+            if api_success(ret[0]):
+                self.is_streaming = False
+                self._invalidate_settings()
+                logger.info("⏹️ Camera stream stopped (no more consumers)")
+            else:
+                logger.warning("⚠️ Failed to stop stream: %s", ret[0])
+    
+    def _start_stream_locked(self, purpose: str) -> bool:
+        """Start the stream if needed; caller holds _stream_lock."""
+        if self.is_streaming:
+            logger.debug("Camera already streaming, proceeding with %s", purpose)
+            return True
+        logger.info("📹 Starting stream for %s...", purpose)
+        ret = PxLApi.setStreamState(self.camera_handle, PxLApi.StreamState.START)
+        if not api_success(ret[0]) and ret[0] != _API_ALREADY_STREAMING:
+            logger.error("❌ Failed to start stream. Error: %s", ret[0])
+            return False
+        self.is_streaming = True
+        self._invalidate_settings()
+        logger.info("✅ Stream started successfully for %s", purpose)
+        return True
+    
+    def _get_raw_image_size(self) -> Optional[Tuple[int, int, int]]:
+        """
+        Raw frame (width, height, bytes_per_pixel), queried from the camera once.
+        
+        ROI, pixel addressing and pixel format are never changed by this
+        service, so the result stays valid until invalidate_image_size().
+        """
+        if self._raw_image_size is None:
+            width, height, bytes_per_pixel = determine_raw_image_size(self.camera_handle)
+            if width == 0 or height == 0:
+                return None
+            self._raw_image_size = (width, height, bytes_per_pixel)
+            self.width = width
+            self.height = height
+            self._invalidate_settings()
+        return self._raw_image_size
+    
+    def _prepare_capture_buffers(self):
+        """
+        Resolve the raw frame size and allocate the reused raw buffer up front
+        (at connect time), so the first capture doesn't pay for either and the
+        reported width/height match the sensor from the start.
+        """
+        image_size = self._get_raw_image_size()
+        if image_size is None:
+            return
+        width, height, bytes_per_pixel = image_size
+        self._raw_buffer = np.empty((height, width * bytes_per_pixel), dtype=np.uint8)
+    
+    def invalidate_image_size(self):
+        """Forget the cached raw frame size (call after changing ROI/pixel format)."""
+        self._raw_image_size = None
+        self._raw_buffer = None
+    
     def _capture_simulated_image(self) -> np.ndarray:
         """
         Generate a simulated test pattern image.
         Uses shared utility function to avoid code duplication.
+        
+        The pattern is animated, so it is regenerated per capture, but into a
+        buffer kept on the instance. The frame is only valid until the next
+        capture_image call, which has finished encoding it by then.
         """
-        return generate_simulated_frame(self.width, self.height)
+        shape = (self.height, self.width, 3)
+        if self._sim_frame is None or self._sim_frame.shape != shape:
+            self._sim_frame = np.empty(shape, dtype=np.uint8)
+        return generate_simulated_frame(self.width, self.height, out=self._sim_frame)
     
     # ==================== Video Recording Methods ====================
     
@@ -639,32 +918,28 @@ class PixelinkCamera:
         try:
             # Ensure stream is running
             if not self.is_streaming:
-                logger.info("📹 Starting stream for video recording")
-                ret = PxLApi.setStreamState(self.camera_handle, PxLApi.StreamState.START)
-                if PxLApi.apiSuccess(ret[0]):
-                    self.is_streaming = True
-                    # CRITICAL: Give the stream time to stabilize before capturing
-                    # The sample code starts the stream well before calling getEncodedClip
-                    logger.info("⏳ Waiting for stream to stabilize...")
-                    time.sleep(1.0)  # 1 second delay for stream startup
-                else:
-                    raise RuntimeError(f"Failed to start stream: {ret[0]}")
+                if not self._ensure_streaming("video recording"):
+                    raise RuntimeError("Failed to start stream")
+                # CRITICAL: Give the stream time to stabilize before capturing
+                # The sample code starts the stream well before calling getEncodedClip
+                logger.info("⏳ Waiting for stream to stabilize...")
+                time.sleep(1.0)  # 1 second delay for stream startup
             
             # Get effective frame rate
             camera_fps = self._get_effective_frame_rate()
             num_images = int(duration * camera_fps / decimation)
             
-            logger.info(f"🎬 Starting video recording:")
-            logger.info(f"   Duration requested: {duration}s")
-            logger.info(f"   Camera FPS: {camera_fps:.2f}")
-            logger.info(f"   Playback FPS: {playback_frame_rate}")
-            logger.info(f"   Decimation: {decimation}")
-            logger.info(f"   Total images to capture: {num_images}")
-            logger.info(f"   Expected capture time: {num_images / camera_fps:.2f}s")
+            logger.info("🎬 Starting video recording:")
+            logger.info("   Duration requested: %ss", duration)
+            logger.info("   Camera FPS: %.2f", camera_fps)
+            logger.info("   Playback FPS: %s", playback_frame_rate)
+            logger.info("   Decimation: %s", decimation)
+            logger.info("   Total images to capture: %s", num_images)
+            logger.info("   Expected capture time: %.2fs", num_images / camera_fps)
             
             # Create H.264 file path (intermediate file)
             h264_path = save_path.with_suffix('.h264')
-            logger.info(f"   H.264 file: {h264_path}")
+            logger.info("   H.264 file: %s", h264_path)
             
             # Configure clip encoding
             clip_info = PxLApi.ClipEncodingInfo()
@@ -685,10 +960,10 @@ class PixelinkCamera:
                 self.num_images_streamed = numberOfFrameBlocksStreamed
                 self.capture_rc = retCode
                 self.capture_finished = True
-                logger.info(f"📹 === CALLBACK FIRED ===")
-                logger.info(f"   Frames captured: {numberOfFrameBlocksStreamed}")
-                logger.info(f"   Return code: {retCode}")
-                logger.info(f"   Success: {PxLApi.apiSuccess(retCode)}")
+                logger.info("📹 === CALLBACK FIRED ===")
+                logger.info("   Frames captured: %s", numberOfFrameBlocksStreamed)
+                logger.info("   Return code: %s", retCode)
+                logger.info("   Success: %s", api_success(retCode))
                 return PxLApi.ReturnCode.ApiSuccess
             
             self.video_callback = term_fn
@@ -702,7 +977,7 @@ class PixelinkCamera:
                 term_fn
             )
             
-            if not PxLApi.apiSuccess(ret[0]):
+            if not api_success(ret[0]):
                 self.is_recording = False
                 raise RuntimeError(f"Failed to start video recording: {ret[0]}")
             
@@ -722,7 +997,7 @@ class PixelinkCamera:
             
         except Exception as e:
             self.is_recording = False
-            logger.error(f"Error starting video recording: {e}", exc_info=True)
+            logger.error("Error starting video recording: %s", e, exc_info=True)
             raise
     
     def stop_video_recording(self, h264_path: Path, mp4_path: Path) -> Dict:
@@ -744,8 +1019,8 @@ class PixelinkCamera:
         
         try:
             logger.info("🛑 Stopping video recording...")
-            logger.info(f"   Capture finished flag: {self.capture_finished}")
-            logger.info(f"   Is streaming: {self.is_streaming}")
+            logger.info("   Capture finished flag: %s", self.capture_finished)
+            logger.info("   Is streaming: %s", self.is_streaming)
             
             # If recording is still in progress (not yet finished), abort it by stopping the stream
             # This follows the PixeLink sample code pattern for aborting early
@@ -753,11 +1028,12 @@ class PixelinkCamera:
                 logger.info("⏹️ Aborting capture by stopping stream (user stopped early)...")
                 if self.is_streaming:
                     ret = PxLApi.setStreamState(self.camera_handle, PxLApi.StreamState.STOP)
-                    if PxLApi.apiSuccess(ret[0]):
+                    if api_success(ret[0]):
                         self.is_streaming = False
+                        self._invalidate_settings()
                         logger.info("   Stream stopped successfully")
                     else:
-                        logger.warning(f"⚠️ Failed to stop stream: {ret[0]}")
+                        logger.warning("⚠️ Failed to stop stream: %s", ret[0])
             else:
                 logger.info("✅ Capture already finished naturally (full duration completed)")
             
@@ -771,50 +1047,52 @@ class PixelinkCamera:
                 elapsed = time.time() - start_time
                 poll_count += 1
                 if poll_count % 20 == 0:  # Log every second
-                    logger.info(f"   Still waiting... ({elapsed:.1f}s elapsed)")
+                    logger.info("   Still waiting... (%.1fs elapsed)", elapsed)
                 if elapsed > timeout:
-                    logger.error(f"⏱️ Callback timeout after {timeout}s!")
-                    logger.error(f"   Capture finished: {self.capture_finished}")
-                    logger.error(f"   Images streamed: {self.num_images_streamed}")
-                    logger.error(f"   Capture RC: {self.capture_rc}")
+                    logger.error("⏱️ Callback timeout after %ss!", timeout)
+                    logger.error("   Capture finished: %s", self.capture_finished)
+                    logger.error("   Images streamed: %s", self.num_images_streamed)
+                    logger.error("   Capture RC: %s", self.capture_rc)
                     break
                 time.sleep(0.05)  # Poll every 50ms
             
             callback_wait_time = time.time() - start_time
-            logger.info(f"   Callback completed in {callback_wait_time:.3f}s")
+            logger.info("   Callback completed in %.3fs", callback_wait_time)
             
             self.is_recording = False
             
             # Check capture result
-            if self.capture_rc and not PxLApi.apiSuccess(self.capture_rc):
+            if self.capture_rc and not api_success(self.capture_rc):
                 if self.capture_rc == -2147483630:  # ApiStreamStopped
-                    logger.info(f"📹 Capture was aborted (user stopped early)")
+                    logger.info("📹 Capture was aborted (user stopped early)")
                 elif self.capture_rc == PxLApi.ReturnCode.ApiSuccessWithFrameLoss:
-                    logger.warning(f"⚠️ Some frames were lost during capture")
+                    logger.warning("⚠️ Some frames were lost during capture")
                 else:
-                    logger.warning(f"⚠️ Capture error code: {self.capture_rc}")
+                    logger.warning("⚠️ Capture error code: %s", self.capture_rc)
             
             num_images_captured = self.num_images_streamed
-            logger.info(f"📹 Captured {num_images_captured} frames")
+            logger.info("📹 Captured %s frames", num_images_captured)
             
             # Check if H.264 file was created
             if not h264_path.exists():
-                logger.error(f"❌ H.264 file not found: {h264_path}")
+                logger.error("❌ H.264 file not found: %s", h264_path)
                 # Try to look for any .h264 files in the directory
-                import os
                 parent_dir = h264_path.parent
                 h264_files = list(parent_dir.glob("*.h264"))
                 if h264_files:
                     h264_path = max(h264_files, key=lambda p: p.stat().st_mtime)
-                    logger.info(f"Using most recent H.264 file: {h264_path}")
+                    logger.info("Using most recent H.264 file: %s", h264_path)
                 else:
                     raise RuntimeError(f"H.264 file not found: {h264_path}")
             
             # Check H.264 file size
-            h264_size = h264_path.stat().st_size if h264_path.exists() else 0
-            logger.info(f"📄 H.264: {h264_size / 1024:.1f} KB")
+            try:
+                h264_size = os.stat(h264_path).st_size
+            except FileNotFoundError:
+                h264_size = 0
+            logger.info("📄 H.264: %.1f KB", h264_size / 1024)
             
-            logger.info(f"🔄 Converting H.264 to MP4 container...")
+            logger.info("🔄 Converting H.264 to MP4 container...")
             ret = PxLApi.formatClip(
                 str(h264_path),
                 str(mp4_path),
@@ -822,8 +1100,8 @@ class PixelinkCamera:
                 PxLApi.ClipFileContainerFormat.MP4  # Changed from AVI to MP4 for browser compatibility
             )
             
-            if not PxLApi.apiSuccess(ret[0]):
-                logger.error(f"Failed to convert video to MP4: {ret[0]}")
+            if not api_success(ret[0]):
+                logger.error("Failed to convert video to MP4: %s", ret[0])
                 try:
                     h264_path.unlink()
                 except:
@@ -831,25 +1109,29 @@ class PixelinkCamera:
                 raise RuntimeError(f"Failed to convert video to MP4: {ret[0]}")
             
             # Get file info
-            file_size = mp4_path.stat().st_size if mp4_path.exists() else 0
+            try:
+                file_size = os.stat(mp4_path).st_size
+            except FileNotFoundError:
+                file_size = 0
             
-            logger.info(f"✅ Video saved: {file_size / 1024 / 1024:.2f} MB")
+            logger.info("✅ Video saved: %.2f MB", file_size / 1024 / 1024)
             
             # Clean up H.264 file
             try:
                 h264_path.unlink()
             except Exception as e:
-                logger.warning(f"Could not delete H.264 file: {e}")
+                logger.warning("Could not delete H.264 file: %s", e)
             
             # IMPORTANT: Restart the stream so the camera is ready for live feed and image capture
             # The streamer or next capture will use this stream
             logger.info("📹 Restarting camera stream after video recording...")
             ret = PxLApi.setStreamState(self.camera_handle, PxLApi.StreamState.START)
-            if PxLApi.apiSuccess(ret[0]):
+            if api_success(ret[0]):
                 self.is_streaming = True
+                self._invalidate_settings()
                 logger.info("✅ Stream restarted successfully")
             else:
-                logger.warning(f"⚠️ Failed to restart stream: {ret[0]}")
+                logger.warning("⚠️ Failed to restart stream: %s", ret[0])
             
             return {
                 "success": True,
@@ -871,7 +1153,7 @@ class PixelinkCamera:
             
         except Exception as e:
             self.is_recording = False
-            logger.error(f"Error stopping video recording: {e}", exc_info=True)
+            logger.error("Error stopping video recording: %s", e, exc_info=True)
             raise
     
     def cancel_video_recording(self) -> bool:
@@ -885,6 +1167,7 @@ class PixelinkCamera:
             if self.is_streaming:
                 PxLApi.setStreamState(self.camera_handle, PxLApi.StreamState.STOP)
                 self.is_streaming = False
+                self._invalidate_settings()
             
             self.is_recording = False
             self.capture_finished = True
@@ -893,16 +1176,17 @@ class PixelinkCamera:
             # Restart the stream for live feed and image capture
             logger.info("📹 Restarting camera stream after cancellation...")
             ret = PxLApi.setStreamState(self.camera_handle, PxLApi.StreamState.START)
-            if PxLApi.apiSuccess(ret[0]):
+            if api_success(ret[0]):
                 self.is_streaming = True
+                self._invalidate_settings()
                 logger.info("✅ Stream restarted successfully")
             else:
-                logger.warning(f"⚠️ Failed to restart stream: {ret[0]}")
+                logger.warning("⚠️ Failed to restart stream: %s", ret[0])
             
             return True
             
         except Exception as e:
-            logger.error(f"Error canceling video recording: {e}")
+            logger.error("Error canceling video recording: %s", e)
             return False
     
     def _get_effective_frame_rate(self) -> float:
@@ -910,18 +1194,18 @@ class PixelinkCamera:
         Get the effective frame rate being used by the camera.
         Tries ACTUAL_FRAME_RATE first, falls back to FRAME_RATE.
         """
-        frame_rate_feature = PxLApi.FeatureId.FRAME_RATE
+        frame_rate_feature = _FID_FRAME_RATE
         
         # Try to use ACTUAL_FRAME_RATE if available
-        ret = PxLApi.getCameraFeatures(self.camera_handle, PxLApi.FeatureId.ACTUAL_FRAME_RATE)
-        if PxLApi.apiSuccess(ret[0]):
+        ret = PxLApi.getCameraFeatures(self.camera_handle, _FID_ACTUAL_FRAME_RATE)
+        if api_success(ret[0]):
             camera_features = ret[1]
-            if camera_features.Features[0].uFlags & PxLApi.FeatureFlags.PRESENCE:
-                frame_rate_feature = PxLApi.FeatureId.ACTUAL_FRAME_RATE
+            if camera_features.Features[0].uFlags & _FF_PRESENCE:
+                frame_rate_feature = _FID_ACTUAL_FRAME_RATE
         
         # Get the frame rate
         ret = PxLApi.getFeature(self.camera_handle, frame_rate_feature)
-        if not PxLApi.apiSuccess(ret[0]):
+        if not api_success(ret[0]):
             logger.warning("Could not get frame rate, using default 30 fps")
             return 30.0
         
@@ -932,56 +1216,22 @@ class PixelinkCamera:
         """Check if currently recording video"""
         return self.is_recording
     
-    def __init__(self, serial_number: Optional[str] = None):
-        # Initialize video recording variables first
-        self.__init_video_recording_vars()
-        
-        # Original initialization code
-        self.serial_number = serial_number
-        self.camera_handle = None
-        self.is_connected = False
-        self.is_streaming = False
-        # Note: PixeLink API uses SECONDS for exposure internally
-        # We'll store as milliseconds for UI/database, convert when needed
-        self.exposure = 100.0  # Default 100ms
-        self.gain = 1.0
-        self.gamma = 1.0  # Default gamma value
-        self.width = 1280
-        self.height = 1024
-        
-        # Exposure limits (in milliseconds)
-        self.exposure_min = 0.001  # 1 microsecond
-        self.exposure_max = 10000.0  # 10 seconds
-        
-        # Gain limits
-        self.gain_min = 1.0
-        self.gain_max = 16.0
-        
-        # Gamma limits
-        self.gamma_min = 0.5
-        self.gamma_max = 4.0
-        self.gamma_supported = False  # Will be set during initialization
-        
-        # Auto-exposure state
-        self.auto_exposure_enabled = False
-        self.auto_exposure_supported = False  # Will be set during initialization
-        
-        logger.info(f"PixelinkCamera initializing... PIXELINK_AVAILABLE={PIXELINK_AVAILABLE}")
-        
-        if PIXELINK_AVAILABLE:
-            self._initialize_camera()
-        else:
-            logger.warning("⚠️ PixeLink SDK not available - running in SIMULATED mode")
-            logger.warning("   Install pixelinkWrapper to use real camera")
-    
     def disconnect(self):
         if PIXELINK_AVAILABLE and self.is_connected:
             try:
+                # The stream is left running between captures; stop it once here
+                with self._stream_lock:
+                    if self.is_streaming:
+                        PxLApi.setStreamState(self.camera_handle, PxLApi.StreamState.STOP)
+                        self.is_streaming = False
+                    self._stream_refs = 0
                 PxLApi.uninitialize(self.camera_handle)
                 self.is_connected = False
+                self._invalidate_settings()
+                self.invalidate_image_size()
                 logger.info("Camera disconnected")
             except Exception as e:
-                logger.error(f"Error disconnecting: {e}")
+                logger.error("Error disconnecting: %s", e)
     
     def __del__(self):
         self.disconnect()